@@ -17,13 +17,14 @@ class SensorHarmonized(Base):
     lat = Column(DECIMAL(10,6), nullable=False, index=True)
     lon = Column(DECIMAL(10,6), nullable=False, index=True)
     timestamp_utc = Column(TIMESTAMPTZ, nullable=False, index=True)
-    raw_pm2_5 = Column(DECIMAL(8,2))
-    rh = Column(DECIMAL(5,2))  # Relative humidity
-    temperature = Column(DECIMAL(6,2))
-    pressure = Column(DECIMAL(7,2))
-    raw_pm10 = Column(DECIMAL(8,2))
-    no2 = Column(DECIMAL(8,2))
-    o3 = Column(DECIMAL(8,2))
+    # Measurements load as floats; QC and calibration work in float64
+    raw_pm2_5 = Column(DECIMAL(8,2, asdecimal=False))
+    rh = Column(DECIMAL(5,2, asdecimal=False))  # Relative humidity
+    temperature = Column(DECIMAL(6,2, asdecimal=False))
+    pressure = Column(DECIMAL(7,2, asdecimal=False))
+    raw_pm10 = Column(DECIMAL(8,2, asdecimal=False))
+    no2 = Column(DECIMAL(8,2, asdecimal=False))
+    o3 = Column(DECIMAL(8,2, asdecimal=False))
     source = Column(String(50), nullable=False, index=True)
     raw_blob = Column(JSONB)  # Original data for traceability
     qc_flags = Column(ARRAY(Text), default=list)
@@ -46,18 +47,18 @@ class SensorCalibration(Base):
     
     sensor_id = Column(String(255), primary_key=True)
     sensor_type = Column(String(100), nullable=False)
-    alpha = Column(DECIMAL(10,4), default=0.0)  # Intercept
-    beta = Column(DECIMAL(10,4), default=1.0)   # Raw PM2.5 coefficient
-    gamma = Column(DECIMAL(10,4), default=0.0)  # Humidity coefficient
-    delta = Column(DECIMAL(10,4), default=0.0)  # Temperature coefficient
-    sigma_i = Column(DECIMAL(8,4), nullable=False, default=5.0)  # Residual uncertainty
+    alpha = Column(DECIMAL(10,4, asdecimal=False), default=0.0)  # Intercept
+    beta = Column(DECIMAL(10,4, asdecimal=False), default=1.0)   # Raw PM2.5 coefficient
+    gamma = Column(DECIMAL(10,4, asdecimal=False), default=0.0)  # Humidity coefficient
+    delta = Column(DECIMAL(10,4, asdecimal=False), default=0.0)  # Temperature coefficient
+    sigma_i = Column(DECIMAL(8,4, asdecimal=False), nullable=False, default=5.0)  # Residual uncertainty
     last_calibrated = Column(TIMESTAMPTZ)
-    calibration_r2 = Column(DECIMAL(5,4))
+    calibration_r2 = Column(DECIMAL(5,4, asdecimal=False))
     reference_count = Column(Integer, default=0)
     calibration_method = Column(String(50), default='linear')
     is_active = Column(Boolean, default=True)
-    validation_rmse = Column(DECIMAL(8,4))
-    validation_bias = Column(DECIMAL(8,4))
+    validation_rmse = Column(DECIMAL(8,4, asdecimal=False))
+    validation_bias = Column(DECIMAL(8,4, asdecimal=False))
     created_at = Column(TIMESTAMPTZ, server_default=func.now())
     updated_at = Column(TIMESTAMPTZ, server_default=func.now(), onupdate=func.now())
 
@@ -234,20 +234,21 @@ async def get_calibration_status(
 
 @router.post("/pipeline/run-daily-calibration")
 async def run_daily_calibration_pipeline(
+    include_details: bool = False,
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db)
 ):
     """Run the daily automated calibration pipeline"""
     try:
         if background_tasks:
-            background_tasks.add_task(automated_pipeline.run_daily_calibration_update, db)
+            background_tasks.add_task(automated_pipeline.run_daily_calibration_update, db, include_details)
             return {
                 'status': 'started',
                 'message': 'Daily calibration pipeline started in background',
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
         else:
-            result = await automated_pipeline.run_daily_calibration_update(db)
+            result = await automated_pipeline.run_daily_calibration_update(db, include_details)
             return {
                 'status': 'completed',
                 'result': result,
@@ -105,8 +105,10 @@ async def get_harmonized_sensors(
             # Include calibrated values if requested
             if include_calibrated:
                 calibrated_data = calibration_service.apply_calibration(result.sensor_id, sensor_data)
+                pm25_corrected = calibrated_data.get('pm2_5_corrected')
                 sensor_data.update({
-                    "pm2_5_corrected": calibrated_data.get('pm2_5_corrected'),
+                    # Full precision is kept through calibration; round only for display
+                    "pm2_5_corrected": round(pm25_corrected, 2) if pm25_corrected is not None else None,
                     "calibration_applied": calibrated_data.get('calibration_applied', False),
                     "sigma_i": calibrated_data.get('sigma_i'),
                     "calibration_method": calibrated_data.get('calibration_method')
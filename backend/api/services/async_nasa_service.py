@@ -30,6 +30,7 @@ class AsyncNASAService:
         # Session configuration optimized for NASA APIs
         self.session_config = {
             'timeout': aiohttp.ClientTimeout(total=60, connect=15),
+            'auto_decompress': True,
             'connector': aiohttp.TCPConnector(
                 limit=20,
                 limit_per_host=10,
@@ -219,7 +220,8 @@ class AsyncNASAService:
         
         headers = {
             "Authorization": f"Bearer {self.jwt_token}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate"  # CMR JSON compresses ~5-10x
         }
         
         west, south, east, north = bbox
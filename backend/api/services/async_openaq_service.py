@@ -27,8 +27,13 @@ class AsyncOpenAQService:
         }
     
     @rate_limited('openaq')
-    async def get_latest_measurements_cached(self, bbox: Optional[str] = None, limit: int = 100) -> List[Dict]:
-        """Get latest measurements with caching"""
+    async def get_latest_measurements_cached(self, bbox: Optional[str] = None, limit: int = 100,
+                                             stale_ttl: int = 600) -> List[Dict]:
+        """Get latest measurements with stale-while-revalidate caching
+        
+        Entries older than the OpenAQ TTL are still served for a further
+        ``stale_ttl`` seconds while a background refresh runs.
+        """
         cache_key = cache_service.generate_cache_key(
             'openaq_latest',
             {'bbox': bbox or 'global', 'limit': limit}
@@ -37,10 +42,13 @@ class AsyncOpenAQService:
         async def fetch_latest():
             return await self._fetch_latest_measurements(bbox, limit)
         
-        return await cache_service.get_or_set(
+        ttl = cache_service.ttl_config['openaq_data']
+        return await cache_service.get_or_set_swr(
             cache_key,
             fetch_latest,
-            cache_type='openaq_data'
+            cache_type='openaq_data',
+            ttl=ttl,
+            stale_ttl=ttl + stale_ttl
         )
     
     async def _fetch_latest_measurements(self, bbox: Optional[str] = None, limit: int = 100) -> List[Dict]:
@@ -178,20 +186,18 @@ class AsyncOpenAQService:
         async def fetch_with_limit(location_id: str):
             async with semaphore:
                 try:
-                    return await self.get_measurements_for_location_cached(location_id, parameter)
+                    return location_id, await self.get_measurements_for_location_cached(location_id, parameter)
                 except Exception as e:
                     logger.warning(f"Failed to fetch location {location_id}: {e}")
-                    return []
-        
-        tasks = {loc_id: fetch_with_limit(loc_id) for loc_id in location_ids}
-        completed_tasks = await asyncio.gather(*tasks.values(), return_exceptions=True)
-        
-        # Map results
-        for loc_id, result in zip(location_ids, completed_tasks):
-            if result and not isinstance(result, Exception):
-                results[loc_id] = result
-            else:
-                results[loc_id] = []
+                    return location_id, []
+        
+        # Consume results as they complete so each response can be released
+        # without waiting for the slowest location
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(fetch_with_limit(loc_id)) for loc_id in location_ids]
+            for next_done in asyncio.as_completed(tasks):
+                loc_id, result = await next_done
+                results[loc_id] = result or []
         
         return results
     
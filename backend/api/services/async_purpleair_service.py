@@ -1,15 +1,174 @@
-import aiohttp
+import httpx
 import asyncio
-from typing import Dict, List, Optional
+import ijson
+import numpy as np
+import orjson
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 import os
+import time
 import logging
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 
 from .redis_cache_service import cache_service
-from .rate_limiter import rate_limited
+from .rate_limiter import UpstreamBudget, WeightedTokenBucket
 
 logger = logging.getLogger(__name__)
 
+def _status_of(error: Exception) -> Optional[int]:
+    """HTTP status of a failed upstream call, if it got a response"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return None
+
+@lru_cache(maxsize=32)
+def _compile_row_builder(positions: Tuple[Optional[int], ...], target: type):
+    """Compile ``build(row) -> target(row[i], ...)`` for a fixed column layout
+    
+    Field positions are constant-folded into the generated source, so the
+    per-row path is a single call with no lookups or length checks.
+    ``None`` positions become ``None`` arguments.
+    """
+    args = ", ".join("None" if i is None else f"row[{i}]" for i in positions)
+    namespace = {"target": target}
+    exec(f"def build(row):\n    return target({args})\n", namespace)
+    return namespace["build"]
+
+def _column_to_list(values: np.ndarray, as_int: bool = False) -> List:
+    """Convert a NaN-padded float column to Python values with None for gaps"""
+    if as_int:
+        return [None if np.isnan(v) else int(v) for v in values.tolist()]
+    return np.where(np.isnan(values), None, values).tolist()
+
+class _AsyncResponseReader:
+    """Async file-like adapter so ijson can consume an httpx response stream"""
+    
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+    
+    async def read(self, size: int = -1) -> bytes:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+@dataclass
+class SensorColumns:
+    """Struct-of-arrays layout for PurpleAir sensor rows
+    
+    Numeric columns are float64 arrays with NaN for missing values so
+    column scans (bbox masks, interpolation inputs) run as vectorized
+    passes. Per-row dicts are only built by ``to_records`` at the
+    serialization boundary.
+    """
+    sensor_index: np.ndarray
+    name: List[Optional[str]]
+    latitude: np.ndarray
+    longitude: np.ndarray
+    altitude: np.ndarray
+    location_type: List[Optional[int]]
+    pm25: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+    pressure: np.ndarray
+    last_seen: np.ndarray
+    
+    @classmethod
+    def from_rows(cls, rows: List[List]) -> 'SensorColumns':
+        """Build columns from PurpleAir data rows padded to 11 fields"""
+        columns = list(zip(*rows)) if rows else [()] * 11
+        
+        def floats(index: int) -> np.ndarray:
+            return np.array(columns[index], dtype=np.float64)
+        
+        return cls(
+            sensor_index=np.array(columns[0], dtype=np.int64),
+            name=list(columns[1]),
+            latitude=floats(2),
+            longitude=floats(3),
+            altitude=floats(4),
+            location_type=list(columns[5]),
+            pm25=floats(6),
+            temperature=floats(7),
+            humidity=floats(8),
+            pressure=floats(9),
+            last_seen=floats(10)
+        )
+    
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'SensorColumns':
+        """Build columns from standardized sensor dicts"""
+        fields = ("sensor_index", "name", "latitude", "longitude", "altitude", "location_type",
+                  "pm25", "temperature", "humidity", "pressure", "last_seen")
+        return cls.from_rows([[record.get(field) for field in fields] for record in records])
+    
+    def __len__(self) -> int:
+        return len(self.sensor_index)
+    
+    def bbox_mask(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """Boolean mask of sensors inside the bounding box"""
+        return ((self.latitude >= south) & (self.latitude <= north) &
+                (self.longitude >= west) & (self.longitude <= east))
+    
+    def to_records(self) -> Iterator[Dict]:
+        """Yield standardized sensor dicts for serialization"""
+        rows = zip(
+            self.sensor_index.tolist(),
+            self.name,
+            _column_to_list(self.latitude),
+            _column_to_list(self.longitude),
+            _column_to_list(self.altitude, as_int=True),
+            self.location_type,
+            _column_to_list(self.pm25),
+            _column_to_list(self.temperature),
+            _column_to_list(self.humidity),
+            _column_to_list(self.pressure),
+            _column_to_list(self.last_seen, as_int=True)
+        )
+        for (sensor_index, name, latitude, longitude, altitude, location_type,
+             pm25, temperature, humidity, pressure, last_seen) in rows:
+            yield {
+                "sensor_index": sensor_index,
+                "name": name,
+                "latitude": latitude,
+                "longitude": longitude,
+                "altitude": altitude,
+                "location_type": location_type,
+                "pm25": pm25,
+                "temperature": temperature,
+                "humidity": humidity,
+                "pressure": pressure,
+                "last_seen": last_seen,
+                "source": "purpleair"
+            }
+
+@dataclass(slots=True, frozen=True)
+class PurpleAirSensor:
+    """Single PurpleAir sensor as returned by the per-sensor lookups
+    
+    Slots instances are smaller and faster to build than the equivalent
+    dict; use ``to_dict`` (or orjson, which serializes dataclasses
+    natively) at the response boundary.
+    """
+    sensor_index: int
+    name: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    pm25: Optional[float]
+    temperature: Optional[float]
+    humidity: Optional[float]
+    pressure: Optional[float]
+    last_seen: Optional[int]
+    source: str = "purpleair"
+    
+    # PurpleAir field names in constructor order
+    api_fields = ("sensor_index", "name", "latitude", "longitude", "pm2.5",
+                  "temperature", "humidity", "pressure", "last_seen")
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
 class AsyncPurpleAirService:
     """Enhanced async PurpleAir service with caching and rate limiting"""
     
@@ -20,36 +179,86 @@ class AsyncPurpleAirService:
         if not self.api_key:
             logger.warning("PURPLEAIR_API_KEY not found. Using mock data.")
         
-        # Request session with optimized settings
-        self.session_config = {
-            'timeout': aiohttp.ClientTimeout(total=30, connect=10),
-            'connector': aiohttp.TCPConnector(
-                limit=10,  # Connection pool size
-                limit_per_host=5,
-                keepalive_timeout=60,
-                enable_cleanup_closed=True
+        # Shared HTTP/2 client; requests to the host are multiplexed over
+        # one connection instead of a pool of HTTP/1.1 connections
+        self.client_config = {
+            'timeout': httpx.Timeout(30.0, connect=10.0),
+            'limits': httpx.Limits(
+                max_connections=10,
+                max_keepalive_connections=5,
+                keepalive_expiry=60
             )
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Weighted bucket for the PurpleAir per-minute quota. PurpleAir bills by
+        # fields and rows returned, so each call spends a matching cost; only
+        # upstream calls acquire it, so cache hits never consume quota
+        self._limiter = WeightedTokenBucket(250, 60)
+        
+        # Remaining quota as advertised by the upstream rate-limit headers
+        self._budget = UpstreamBudget('purpleair')
+        
+        # Redis GEO index of every fetched sensor plus the bboxes it fully covers
+        self.geo_index_key = "seit:pa_sensors"
+        self.geo_coverage_key = "seit:pa_sensors:coverage"
+        
+        # Futures for upstream fetches currently in flight, keyed by cache key
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(http2=True, **self.client_config)
+        return self._client
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    @staticmethod
+    def _fields_cost(n_fields: int) -> float:
+        """Quota cost of a sensor lookup requesting ``n_fields`` fields"""
+        return 1 + 0.1 * n_fields
+    
+    @staticmethod
+    def _history_cost(params: Dict) -> float:
+        """Quota cost of a history call, proportional to fields x returned points"""
+        n_fields = params["fields"].count(",") + 1
+        span_minutes = max(0, params["end_timestamp"] - params["start_timestamp"]) / 60
+        n_points = span_minutes / max(params["average"], 1)
+        return max(n_fields * n_points / 1000, 0.1)
+    
+    async def _single_flight(self, key: str, fetch_function):
+        """Coalesce concurrent cache misses for the same key onto one upstream call"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch_function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited future does not log
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
     
-    @rate_limited('purpleair')
     async def get_sensors_cached(self, bbox: Optional[str] = None, limit: int = 100) -> List[Dict]:
         """Get PurpleAir sensors with caching and rate limiting"""
         try:
-            # Generate cache key
-            cache_key = cache_service.generate_cache_key(
-                'purpleair_sensors',
-                {'bbox': bbox or 'global', 'limit': limit}
-            )
-            
-            # Try cache first
-            async def fetch_fresh_data():
-                return await self._fetch_sensors_from_api(bbox, limit)
-            
-            sensors = await cache_service.get_or_set(
-                cache_key,
-                fetch_fresh_data,
-                cache_type='purpleair_sensors'
-            )
+            columns = await self.get_sensor_columns_cached(bbox, limit)
+            sensors = list(columns.to_records())
             
             logger.info(f"Retrieved {len(sensors)} PurpleAir sensors (bbox: {bbox})")
             return sensors
@@ -58,14 +267,122 @@ class AsyncPurpleAirService:
             logger.error(f"PurpleAir sensor fetch failed: {e}")
             return self._generate_mock_sensors(bbox, limit)
     
-    async def _fetch_sensors_from_api(self, bbox: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    async def get_sensor_columns_cached(self, bbox: Optional[str] = None, limit: int = 100) -> SensorColumns:
+        """Get PurpleAir sensors in columnar form with caching"""
+        # Generate cache key
+        cache_key = cache_service.generate_cache_key(
+            'purpleair_sensors',
+            {'bbox': bbox or 'global', 'limit': limit}
+        )
+        
+        # Try cache first, then the geo index, then the upstream API
+        async def fetch_fresh_data():
+            indexed = await self._search_sensor_index(bbox, limit)
+            if indexed is not None:
+                return indexed
+            
+            try:
+                columns = await self._fetch_sensors_from_api(bbox, limit)
+            except Exception as e:
+                # Cached briefly so follow-up requests skip the failing upstream
+                logger.warning(f"PurpleAir sensor fetch failed: {e}")
+                return cache_service.error_sentinel(_status_of(e))
+            
+            if self.api_key:
+                await self._index_sensors(columns, bbox, complete=len(columns) < limit)
+            return columns
+        
+        columns = await cache_service.get_or_set(
+            cache_key,
+            lambda: self._single_flight(cache_key, fetch_fresh_data),
+            cache_type='purpleair_sensors'
+        )
+        if cache_service.is_error_sentinel(columns):
+            return SensorColumns.from_records(self._generate_mock_sensors(bbox, limit))
+        return columns
+    
+    async def _index_sensors(self, columns: SensorColumns, bbox: Optional[str], complete: bool):
+        """Add fetched sensors to the geo index and record the covered area
+        
+        Only fetches that returned every sensor in their bbox (fewer rows than
+        the limit) mark the area as covered, since a truncated fetch cannot
+        answer other queries over the same area.
+        """
+        records = list(columns.to_records())
+        items = [
+            (record["longitude"], record["latitude"], str(record["sensor_index"]), record)
+            for record in records
+            if record["latitude"] is not None and record["longitude"] is not None
+        ]
+        if not items:
+            return
+        
+        coverage = await cache_service.get(self.geo_coverage_key, 'purpleair_sensors')
+        if coverage is None:
+            # Coverage expired: drop the old index so stale sensors are not served
+            await cache_service.delete(self.geo_index_key)
+            coverage = []
+        
+        if not await cache_service.geo_index(self.geo_index_key, items, cache_type='purpleair_sensors'):
+            return
+        
+        if complete:
+            # Each area expires with the sensor values indexed for it; rewriting the
+            # list refreshes its TTL, so older areas must not outlive their values
+            area = tuple(map(float, bbox.split(','))) if bbox else (-180.0, -90.0, 180.0, 90.0)
+            expires_at = time.time() + cache_service.ttl_config.get('purpleair_sensors', 300)
+            coverage = self._live_coverage(coverage)
+            coverage.append(area + (expires_at,))
+            await cache_service.set(self.geo_coverage_key, coverage, cache_type='purpleair_sensors')
+    
+    @staticmethod
+    def _live_coverage(coverage: List[Tuple[float, ...]]) -> List[Tuple[float, ...]]:
+        """Keep covered areas, stored as (west, south, east, north, expires_at), that have not expired"""
+        now = time.time()
+        return [area for area in coverage if len(area) == 5 and area[4] > now]
+    
+    async def _search_sensor_index(self, bbox: Optional[str], limit: int) -> Optional[SensorColumns]:
+        """Answer a bbox query from the geo index when the area was fully fetched before"""
+        if not bbox:
+            return None
+        
+        try:
+            west, south, east, north = map(float, bbox.split(','))
+        except ValueError:
+            return None
+        
+        coverage = await cache_service.get(self.geo_coverage_key, 'purpleair_sensors')
+        if not coverage or not any(
+            c_west <= west and c_south <= south and east <= c_east and north <= c_north
+            for c_west, c_south, c_east, c_north, _ in self._live_coverage(coverage)
+        ):
+            return None
+        
+        center_lat = (south + north) / 2
+        width_km = (east - west) * 111.32 * max(np.cos(np.radians(center_lat)), 1e-6)
+        height_km = (north - south) * 110.574
+        records = await cache_service.geo_search_box(
+            self.geo_index_key, (west + east) / 2, center_lat, width_km, height_km
+        )
+        if records is None:
+            return None
+        
+        # GEOSEARCH boxes are approximate; trim to the exact bbox
+        columns = SensorColumns.from_records(records)
+        mask = columns.bbox_mask(west, south, east, north)
+        indices = np.flatnonzero(mask)[:limit].tolist()
+        logger.debug(f"Served {len(indices)} PurpleAir sensors for {bbox} from geo index")
+        return SensorColumns.from_records([records[i] for i in indices])
+    
+    async def _fetch_sensors_from_api(self, bbox: Optional[str] = None, limit: int = 100) -> SensorColumns:
         """Fetch sensors directly from PurpleAir API"""
         if not self.api_key:
-            return self._generate_mock_sensors(bbox, limit)
+            return SensorColumns.from_records(self._generate_mock_sensors(bbox, limit))
         
         headers = {"X-API-Key": self.api_key}
+        fields = "sensor_index,name,latitude,longitude,altitude,location_type,pm2.5,temperature,humidity,pressure,last_seen"
         params = {
-            "fields": "sensor_index,name,latitude,longitude,altitude,location_type,pm2.5,temperature,humidity,pressure,last_seen"
+            "fields": fields
         }
         
         if bbox:
@@ -77,43 +394,33 @@ class AsyncPurpleAirService:
                 "selng": east
             })
         
-        async with aiohttp.ClientSession(**self.session_config) as session:
-            url = f"{self.base_url}/sensors"
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    sensors = data.get("data", [])
-                    
-                    # Convert to standardized format
-                    formatted_sensors = []
-                    for sensor in sensors[:limit]:
-                        if len(sensor) >= 6:  # Ensure minimum required fields
-                            formatted_sensor = {
-                                "sensor_index": sensor[0],
-                                "name": sensor[1] if len(sensor) > 1 else f"Sensor {sensor[0]}",
-                                "latitude": sensor[2],
-                                "longitude": sensor[3],
-                                "altitude": sensor[4] if len(sensor) > 4 else None,
-                                "location_type": sensor[5] if len(sensor) > 5 else None,
-                                "pm25": sensor[6] if len(sensor) > 6 else None,
-                                "temperature": sensor[7] if len(sensor) > 7 else None,
-                                "humidity": sensor[8] if len(sensor) > 8 else None,
-                                "pressure": sensor[9] if len(sensor) > 9 else None,
-                                "last_seen": sensor[10] if len(sensor) > 10 else None,
-                                "source": "purpleair"
-                            }
-                            formatted_sensors.append(formatted_sensor)
-                    
-                    return formatted_sensors
-                else:
-                    logger.warning(f"PurpleAir API error: {response.status}")
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status
-                    )
-    
-    @rate_limited('purpleair')
+        client = await self._get_client()
+        await self._limiter.acquire(cost=self._fields_cost(fields.count(",") + 1))
+        url = f"{self.base_url}/sensors"
+        async with self._budget, client.stream("GET", url, headers=headers, params=params) as response:
+            self._budget.update(response.status_code, response.headers)
+            if response.status_code == 200:
+                # Stream-parse rows as they arrive and stop reading once
+                # `limit` rows are in; the rest of the body is discarded
+                rows = []
+                seen = 0
+                async for sensor in ijson.items_async(_AsyncResponseReader(response), 'data.item', use_float=True):
+                    if seen >= limit:
+                        break
+                    seen += 1
+                    if len(sensor) >= 6:  # Ensure minimum required fields
+                        # Pad short rows to 11 fields for the columnar build
+                        rows.append((sensor + [None] * 11)[:11])
+                
+                return SensorColumns.from_rows(rows)
+            else:
+                logger.warning(f"PurpleAir API error: {response.status_code}")
+                raise httpx.HTTPStatusError(
+                    f"PurpleAir API error: {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+    
     async def get_sensor_history_cached(
         self, 
         sensor_id: int, 
@@ -123,14 +430,8 @@ class AsyncPurpleAirService:
     ) -> List[Dict]:
         """Get historical data with caching"""
         try:
-            cache_key = cache_service.generate_cache_key(
-                'purpleair_history',
-                {
-                    'sensor_id': sensor_id,
-                    'start': start_timestamp,
-                    'end': end_timestamp,
-                    'avg': average
-                }
+            cache_key = cache_service.generate_packed_key(
+                'purpleair_history', '<qqqi', sensor_id, start_timestamp, end_timestamp, average
             )
             
             async def fetch_history():
@@ -138,8 +439,9 @@ class AsyncPurpleAirService:
             
             history = await cache_service.get_or_set(
                 cache_key,
-                fetch_history,
-                cache_type='sensor_data'
+                lambda: self._single_flight(cache_key, fetch_history),
+                cache_type='sensor_data',
+                serializer='msgpack'
             )
             
             return history
@@ -167,62 +469,120 @@ class AsyncPurpleAirService:
             "fields": "pm2.5_atm,pm10.0_atm,temperature,humidity,pressure"
         }
         
-        async with aiohttp.ClientSession(**self.session_config) as session:
-            url = f"{self.base_url}/sensors/{sensor_id}/history"
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    history = []
-                    for record in data.get("data", []):
-                        if len(record) >= 1:  # At least timestamp
-                            formatted_record = {
-                                "time_stamp": record[0],
-                                "pm2.5_atm": record[1] if len(record) > 1 else None,
-                                "pm10.0_atm": record[2] if len(record) > 2 else None,
-                                "temperature": record[3] if len(record) > 3 else None,
-                                "humidity": record[4] if len(record) > 4 else None,
-                                "pressure": record[5] if len(record) > 5 else None
-                            }
-                            history.append(formatted_record)
-                    
-                    return history
-                else:
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status
-                    )
-    
-    async def batch_fetch_sensors(self, sensor_ids: List[int]) -> Dict[int, Dict]:
-        """Fetch multiple sensors with optimal batching"""
-        results = {}
-        
-        # Process in batches to avoid overwhelming the API
-        batch_size = 10
-        for i in range(0, len(sensor_ids), batch_size):
-            batch = sensor_ids[i:i + batch_size]
+        client = await self._get_client()
+        await self._limiter.acquire(cost=self._history_cost(params))
+        url = f"{self.base_url}/sensors/{sensor_id}/history"
+        async with self._budget:
+            response = await client.get(url, headers=headers, params=params)
+            self._budget.update(response.status_code, response.headers)
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            records = data.get("data", [])
             
-            # Create concurrent tasks for this batch
-            tasks = []
-            for sensor_id in batch:
-                task = self.get_single_sensor_cached(sensor_id)
-                tasks.append(task)
+            history = [None] * len(records)
+            count = 0
+            for record in records:
+                if len(record) >= 1:  # At least timestamp
+                    row = record + [None] * (6 - len(record))
+                    history[count] = {
+                        "time_stamp": row[0],
+                        "pm2.5_atm": row[1],
+                        "pm10.0_atm": row[2],
+                        "temperature": row[3],
+                        "humidity": row[4],
+                        "pressure": row[5]
+                    }
+                    count += 1
+            del history[count:]
             
-            # Execute batch concurrently
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+            return history
+        else:
+            raise httpx.HTTPStatusError(
+                f"PurpleAir API error: {response.status_code}",
+                request=response.request,
+                response=response
+            )
+    
+    async def batch_fetch_sensors(self, sensor_ids: List[int]) -> Dict[int, PurpleAirSensor]:
+        """Fetch multiple sensors, requesting all uncached ids in one bulk call"""
+        cache_keys = {sensor_id: f"purpleair_sensor:{sensor_id}" for sensor_id in sensor_ids}
+        cached = await cache_service.mget(list(cache_keys.values()), cache_type='sensor_data')
+        
+        results = {}
+        missing_ids = []
+        for sensor_id, cache_key in cache_keys.items():
+            if cache_key in cached:
+                results[sensor_id] = cached[cache_key]
+            else:
+                missing_ids.append(sensor_id)
+        
+        if missing_ids:
+            try:
+                fetched = await self._fetch_sensors_by_ids(missing_ids)
+            except Exception as e:
+                logger.warning(f"Bulk fetch failed for {len(missing_ids)} sensors: {e}")
+                fetched = {}
             
-            # Process results
-            for sensor_id, result in zip(batch, batch_results):
-                if not isinstance(result, Exception):
-                    results[sensor_id] = result
-                else:
-                    logger.warning(f"Failed to fetch sensor {sensor_id}: {result}")
+            for sensor_id, sensor in fetched.items():
+                results[sensor_id] = sensor
+                await cache_service.set(
+                    cache_keys.get(sensor_id, f"purpleair_sensor:{sensor_id}"),
+                    sensor,
+                    cache_type='sensor_data',
+                    custom_ttl=300  # 5 minutes for individual sensors
+                )
         
+        logger.debug(f"Batch fetched {len(results)}/{len(sensor_ids)} sensors "
+                     f"({len(sensor_ids) - len(missing_ids)} from cache)")
         return results
     
-    @rate_limited('purpleair')
-    async def get_single_sensor_cached(self, sensor_id: int) -> Optional[Dict]:
+    async def _fetch_sensors_by_ids(self, sensor_ids: List[int]) -> Dict[int, PurpleAirSensor]:
+        """Fetch several sensors with a single show_only query"""
+        if not self.api_key:
+            return {}
+        
+        headers = {"X-API-Key": self.api_key}
+        params = {
+            "fields": ",".join(PurpleAirSensor.api_fields),
+            "show_only": ",".join(map(str, sensor_ids))
+        }
+        
+        client = await self._get_client()
+        await self._limiter.acquire(cost=self._fields_cost(len(PurpleAirSensor.api_fields)))
+        url = f"{self.base_url}/sensors"
+        async with self._budget:
+            response = await client.get(url, headers=headers, params=params)
+            self._budget.update(response.status_code, response.headers)
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            fields = data.get("fields") or list(PurpleAirSensor.api_fields)
+            
+            # Resolve each constructor field to its column in the response and
+            # get a builder specialized for that layout
+            column_of = {field: i for i, field in enumerate(fields)}
+            positions = tuple(column_of.get(field) for field in PurpleAirSensor.api_fields)
+            build_sensor = _compile_row_builder(positions, PurpleAirSensor)
+            row_width = max((i for i in positions if i is not None), default=-1) + 1
+            
+            sensors = {}
+            for row in data.get("data", []):
+                if len(row) < row_width:
+                    row = row + [None] * (row_width - len(row))
+                sensor = build_sensor(row)
+                if sensor.sensor_index is None:
+                    continue
+                sensors[sensor.sensor_index] = sensor
+            
+            return sensors
+        else:
+            logger.warning(f"PurpleAir API error: {response.status_code}")
+            raise httpx.HTTPStatusError(
+                f"PurpleAir API error: {response.status_code}",
+                request=response.request,
+                response=response
+            )
+    
+    async def get_single_sensor_cached(self, sensor_id: int) -> Optional[PurpleAirSensor]:
         """Get single sensor data with caching"""
         cache_key = f"purpleair_sensor:{sensor_id}"
         
@@ -232,7 +592,7 @@ class AsyncPurpleAirService:
         try:
             return await cache_service.get_or_set(
                 cache_key,
-                fetch_sensor,
+                lambda: self._single_flight(cache_key, fetch_sensor),
                 cache_type='sensor_data',
                 custom_ttl=300  # 5 minutes for individual sensors
             )
@@ -240,40 +600,31 @@ class AsyncPurpleAirService:
             logger.error(f"Error fetching sensor {sensor_id}: {e}")
             return None
     
-    async def _fetch_single_sensor(self, sensor_id: int) -> Optional[Dict]:
+    async def _fetch_single_sensor(self, sensor_id: int) -> Optional[PurpleAirSensor]:
         """Fetch single sensor from API"""
         if not self.api_key:
             return None
         
         headers = {"X-API-Key": self.api_key}
         params = {
-            "fields": "sensor_index,name,latitude,longitude,pm2.5,temperature,humidity,pressure,last_seen"
+            "fields": ",".join(PurpleAirSensor.api_fields)
         }
         
-        async with aiohttp.ClientSession(**self.session_config) as session:
-            url = f"{self.base_url}/sensors/{sensor_id}"
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    sensor = data.get("sensor", {})
-                    return {
-                        "sensor_index": sensor.get("sensor_index"),
-                        "name": sensor.get("name"),
-                        "latitude": sensor.get("latitude"),
-                        "longitude": sensor.get("longitude"),
-                        "pm25": sensor.get("pm2.5"),
-                        "temperature": sensor.get("temperature"),
-                        "humidity": sensor.get("humidity"),
-                        "pressure": sensor.get("pressure"),
-                        "last_seen": sensor.get("last_seen"),
-                        "source": "purpleair"
-                    }
-                else:
-                    return None
+        client = await self._get_client()
+        await self._limiter.acquire(cost=self._fields_cost(len(PurpleAirSensor.api_fields)))
+        url = f"{self.base_url}/sensors/{sensor_id}"
+        async with self._budget:
+            response = await client.get(url, headers=headers, params=params)
+            self._budget.update(response.status_code, response.headers)
+        if response.status_code == 200:
+            data = response.json()
+            sensor = data.get("sensor", {})
+            return PurpleAirSensor(*(sensor.get(field) for field in PurpleAirSensor.api_fields))
+        else:
+            return None
     
     def _generate_mock_sensors(self, bbox: Optional[str] = None, limit: int = 100) -> List[Dict]:
         """Generate mock sensor data for testing"""
-        import random
         
         # San Francisco Bay Area coordinates
         if bbox:
@@ -284,43 +635,60 @@ class AsyncPurpleAirService:
         else:
             west, south, east, north = -122.45, 37.35, -122.15, 37.75
         
-        sensors = []
-        for i in range(min(limit, 25)):  # Limit mock data
-            sensor = {
+        n = min(limit, 25)  # Limit mock data
+        rng = np.random.default_rng()
+        lats = rng.uniform(south, north, n).round(6).tolist()
+        lngs = rng.uniform(west, east, n).round(6).tolist()
+        altitudes = rng.integers(0, 501, n).tolist()
+        location_types = rng.choice(["outside", "inside"], n).tolist()
+        pm25 = rng.uniform(5, 50, n).round(1).tolist()
+        temperatures = rng.uniform(15, 30, n).round(1).tolist()
+        humidities = rng.uniform(30, 80, n).round(1).tolist()
+        pressures = rng.uniform(1000, 1030, n).round(1).tolist()
+        last_seen = int(datetime.utcnow().timestamp())
+        
+        return [
+            {
                 "sensor_index": 100000 + i,
                 "name": f"Mock PurpleAir Sensor {i + 1}",
-                "latitude": round(random.uniform(south, north), 6),
-                "longitude": round(random.uniform(west, east), 6),
-                "altitude": random.randint(0, 500),
-                "location_type": random.choice(["outside", "inside"]),
-                "pm25": round(random.uniform(5, 50), 1),
-                "temperature": round(random.uniform(15, 30), 1),
-                "humidity": round(random.uniform(30, 80), 1),
-                "pressure": round(random.uniform(1000, 1030), 1),
-                "last_seen": int(datetime.utcnow().timestamp()),
+                "latitude": lats[i],
+                "longitude": lngs[i],
+                "altitude": altitudes[i],
+                "location_type": location_types[i],
+                "pm25": pm25[i],
+                "temperature": temperatures[i],
+                "humidity": humidities[i],
+                "pressure": pressures[i],
+                "last_seen": last_seen,
                 "source": "purpleair"
             }
-            sensors.append(sensor)
-        
-        return sensors
+            for i in range(n)
+        ]
     
     def _generate_mock_history(self, sensor_id: int, start_timestamp: int, end_timestamp: int) -> List[Dict]:
         """Generate mock historical data"""
-        import random
-        
-        history = []
-        current = start_timestamp
-        
-        while current <= end_timestamp and len(history) < 100:
-            record = {
-                "time_stamp": current,
-                "pm2.5_atm": round(random.uniform(8, 35), 1),
-                "pm10.0_atm": round(random.uniform(15, 60), 1),
-                "temperature": round(random.uniform(18, 28), 1),
-                "humidity": round(random.uniform(40, 75), 1),
-                "pressure": round(random.uniform(1005, 1025), 1)
-            }
-            history.append(record)
-            current += 3600  # Add 1 hour
+        timestamps = np.arange(start_timestamp, end_timestamp + 1, 3600)[:100]  # Hourly, max 100
+        n = len(timestamps)
+        rng = np.random.default_rng()
+        pm25 = rng.uniform(8, 35, n).round(1).tolist()
+        pm10 = rng.uniform(15, 60, n).round(1).tolist()
+        temperatures = rng.uniform(18, 28, n).round(1).tolist()
+        humidities = rng.uniform(40, 75, n).round(1).tolist()
+        pressures = rng.uniform(1005, 1025, n).round(1).tolist()
         
-        return history
+        return [
+            {
+                "time_stamp": ts,
+                "pm2.5_atm": pm,
+                "pm10.0_atm": pm_10,
+                "temperature": temp,
+                "humidity": hum,
+                "pressure": pres
+            }
+            for ts, pm, pm_10, temp, hum, pres in zip(
+                timestamps.tolist(), pm25, pm10, temperatures, humidities, pressures
+            )
+        ]
+
+# Shared instance so the HTTP connection pool is reused across requests
+purpleair_service = AsyncPurpleAirService()
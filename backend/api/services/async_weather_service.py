@@ -1,14 +1,21 @@
-import aiohttp
+import httpx
 import asyncio
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
 from .redis_cache_service import cache_service
-from .rate_limiter import rate_limited
+from .rate_limiter import UpstreamBudget, WeightedTokenBucket
 
 logger = logging.getLogger(__name__)
 
+def _status_of(error: Exception) -> Optional[int]:
+    """HTTP status of a failed upstream call, if it got a response"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return None
+
 class AsyncWeatherService:
     """Enhanced async weather service with caching and rate limiting"""
     
@@ -16,81 +23,161 @@ class AsyncWeatherService:
         self.base_url = "https://api.open-meteo.com/v1"
         # Open-Meteo is free and doesn't require API keys
         
-        self.session_config = {
-            'timeout': aiohttp.ClientTimeout(total=30, connect=10),
-            'connector': aiohttp.TCPConnector(
-                limit=15,
-                limit_per_host=8,
-                keepalive_timeout=60,
-                enable_cleanup_closed=True
+        # Shared HTTP/2 client; requests to the host are multiplexed over
+        # one connection instead of a pool of HTTP/1.1 connections
+        self.client_config = {
+            'timeout': httpx.Timeout(30.0, connect=10.0),
+            'limits': httpx.Limits(
+                max_connections=15,
+                max_keepalive_connections=8,
+                keepalive_expiry=60
             )
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Bucket for the Open-Meteo per-minute quota, which counts every
+        # location in a multi-location request; only upstream calls acquire
+        # it, so cache hits never consume quota
+        self._limiter = WeightedTokenBucket(600, 60)
+        
+        # Remaining quota as advertised by the upstream rate-limit headers
+        self._budget = UpstreamBudget('open_meteo')
+        
+        # Futures for upstream fetches currently in flight, keyed by cache key
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Open-Meteo accepts comma-separated coordinate lists; chunk them to
+        # keep request URLs to a reasonable length
+        self.max_points_per_request = 100
+        self.current_variables = [
+            "temperature_2m",
+            "relative_humidity_2m",
+            "apparent_temperature",
+            "precipitation",
+            "weather_code",
+            "cloud_cover",
+            "surface_pressure",
+            "wind_speed_10m",
+            "wind_direction_10m"
+        ]
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(http2=True, **self.client_config)
+        return self._client
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def _single_flight(self, key: str, fetch_function):
+        """Coalesce concurrent cache misses for the same key onto one upstream call"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch_function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited future does not log
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
     
-    @rate_limited('open_meteo')
     async def get_current_weather_cached(self, latitude: float, longitude: float) -> Dict:
         """Get current weather with caching"""
-        cache_key = cache_service.generate_cache_key(
-            'weather_current',
-            {'lat': round(latitude, 4), 'lon': round(longitude, 4)}
+        cache_key = cache_service.generate_packed_key(
+            'weather_current', '<dd', round(latitude, 4), round(longitude, 4)
         )
         
         async def fetch_weather():
-            return await self._fetch_current_weather(latitude, longitude)
+            try:
+                return await self._fetch_current_weather(latitude, longitude)
+            except Exception as e:
+                # Cached briefly so follow-up requests skip the failing upstream
+                logger.warning(f"Weather fetch failed for {latitude}, {longitude}: {e}")
+                return cache_service.error_sentinel(_status_of(e))
         
-        return await cache_service.get_or_set(
+        weather = await cache_service.get_or_set(
             cache_key,
-            fetch_weather,
-            cache_type='weather_data'
+            lambda: self._single_flight(cache_key, fetch_weather),
+            cache_type='weather_data',
+            serializer='msgpack'
         )
+        if cache_service.is_error_sentinel(weather):
+            raise Exception(f"Open-Meteo unavailable (status {weather['status']}), retrying after cooldown")
+        return weather
     
     async def _fetch_current_weather(self, latitude: float, longitude: float) -> Dict:
         """Fetch current weather from Open-Meteo"""
+        points = await self._fetch_weather_points([(latitude, longitude)])
+        return points[0]
+    
+    async def _fetch_weather_points(self, coordinates: List[Tuple[float, float]]) -> List[Dict]:
+        """Fetch current weather for many points with Open-Meteo multi-location requests"""
+        weather_points = []
+        for i in range(0, len(coordinates), self.max_points_per_request):
+            weather_points.extend(await self._fetch_weather_chunk(coordinates[i:i + self.max_points_per_request]))
+        return weather_points
+    
+    async def _fetch_weather_chunk(self, chunk: List[Tuple[float, float]]) -> List[Dict]:
+        """Fetch current weather for up to max_points_per_request points in one request"""
+        client = await self._get_client()
         params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "current": [
-                "temperature_2m",
-                "relative_humidity_2m",
-                "apparent_temperature",
-                "precipitation",
-                "weather_code",
-                "cloud_cover",
-                "surface_pressure",
-                "wind_speed_10m",
-                "wind_direction_10m"
-            ]
+            "latitude": ",".join(f"{lat:.4f}" for lat, _ in chunk),
+            "longitude": ",".join(f"{lng:.4f}" for _, lng in chunk),
+            "current": ",".join(self.current_variables)
         }
         
-        async with aiohttp.ClientSession(**self.session_config) as session:
-            url = f"{self.base_url}/forecast"
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    current = data.get("current", {})
-                    
-                    return {
-                        "latitude": data.get("latitude"),
-                        "longitude": data.get("longitude"),
-                        "timestamp": current.get("time"),
-                        "temperature": current.get("temperature_2m"),
-                        "apparent_temperature": current.get("apparent_temperature"),
-                        "humidity": current.get("relative_humidity_2m"),
-                        "pressure": current.get("surface_pressure"),
-                        "wind_speed": current.get("wind_speed_10m"),
-                        "wind_direction": current.get("wind_direction_10m"),
-                        "cloud_cover": current.get("cloud_cover"),
-                        "weather_code": current.get("weather_code"),
-                        "precipitation": current.get("precipitation", 0),
-                        "source": "open_meteo"
-                    }
-                else:
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status
-                    )
+        await self._limiter.acquire(cost=len(chunk))
+        async with self._budget:
+            response = await client.get(f"{self.base_url}/forecast", params=params)
+            self._budget.update(response.status_code, response.headers)
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"Open-Meteo API error: {response.status_code}",
+                request=response.request,
+                response=response
+            )
+        
+        data = response.json()
+        # A single location returns an object, several return a list
+        if isinstance(data, dict):
+            data = [data]
+        return [self._format_current_weather(item) for item in data]
+    
+    def _format_current_weather(self, data: Dict) -> Dict:
+        """Convert an Open-Meteo location payload to the standard weather format"""
+        current = data.get("current", {})
+        
+        return {
+            "latitude": data.get("latitude"),
+            "longitude": data.get("longitude"),
+            "timestamp": current.get("time"),
+            "temperature": current.get("temperature_2m"),
+            "apparent_temperature": current.get("apparent_temperature"),
+            "humidity": current.get("relative_humidity_2m"),
+            "pressure": current.get("surface_pressure"),
+            "wind_speed": current.get("wind_speed_10m"),
+            "wind_direction": current.get("wind_direction_10m"),
+            "cloud_cover": current.get("cloud_cover"),
+            "weather_code": current.get("weather_code"),
+            "precipitation": current.get("precipitation", 0),
+            "source": "open_meteo"
+        }
     
-    @rate_limited('open_meteo')
     async def get_regional_weather_cached(self, bbox: List[float], grid_resolution: float = 0.5) -> List[Dict]:
         """Get weather for region with caching"""
         cache_key = cache_service.generate_cache_key(
@@ -104,74 +191,80 @@ class AsyncWeatherService:
         async def fetch_regional():
             return await self._fetch_regional_weather(bbox, grid_resolution)
         
-        return await cache_service.get_or_set(
+        weather_points = await cache_service.get_or_set(
             cache_key,
-            fetch_regional,
-            cache_type='weather_data'
+            lambda: self._single_flight(cache_key, fetch_regional),
+            cache_type='weather_data',
+            serializer='msgpack'
         )
+        if cache_service.is_error_sentinel(weather_points):
+            return []
+        return weather_points
     
     async def _fetch_regional_weather(self, bbox: List[float], grid_resolution: float = 0.5) -> List[Dict]:
         """Fetch weather data for region using grid points"""
         west, south, east, north = bbox
-        weather_points = []
         
-        # Create grid of weather stations
-        lat = south
-        tasks = []
-        
-        while lat <= north:
-            lng = west
-            while lng <= east:
-                task = self._fetch_current_weather(lat, lng)
-                tasks.append(task)
-                lng += grid_resolution
-            lat += grid_resolution
-        
-        # Limit concurrent requests to avoid overwhelming the API
-        semaphore = asyncio.Semaphore(5)  # Max 5 concurrent requests
-        
-        async def bounded_fetch(task):
-            async with semaphore:
-                try:
-                    return await task
-                except Exception as e:
-                    logger.warning(f"Weather fetch failed for grid point: {e}")
-                    return None
-        
-        bounded_tasks = [bounded_fetch(task) for task in tasks]
-        results = await asyncio.gather(*bounded_tasks, return_exceptions=True)
-        
-        # Filter successful results
-        for result in results:
-            if result and not isinstance(result, Exception):
-                weather_points.append(result)
+        # Create grid of weather stations; the half-step end avoids float drift
+        # dropping or adding the last row/column
+        lats = np.arange(south, north + grid_resolution * 0.5, grid_resolution)
+        lngs = np.arange(west, east + grid_resolution * 0.5, grid_resolution)
+        lat_grid, lng_grid = np.meshgrid(lats, lngs, indexing='ij')
+        coordinates = list(zip(lat_grid.ravel().tolist(), lng_grid.ravel().tolist()))
         
-        return weather_points
+        try:
+            return await self._fetch_weather_points(coordinates)
+        except Exception as e:
+            # Cached briefly so follow-up requests skip the failing upstream
+            logger.warning(f"Regional weather fetch failed for {len(coordinates)} grid points: {e}")
+            return cache_service.error_sentinel(_status_of(e))
     
     async def batch_weather_fetch(self, coordinates: List[Tuple[float, float]]) -> Dict[Tuple, Dict]:
         """Fetch weather for multiple coordinates efficiently"""
         results = {}
         
-        # Create tasks with semaphore for controlled concurrency
-        semaphore = asyncio.Semaphore(8)  # Limit concurrent requests
-        
-        async def fetch_with_limit(lat: float, lon: float):
-            async with semaphore:
-                try:
-                    return await self.get_current_weather_cached(lat, lon)
-                except Exception as e:
-                    logger.warning(f"Weather fetch failed for {lat}, {lon}: {e}")
-                    return None
+        # Deduplicate on the rounded cache key so nearby points share one lookup
+        cache_keys = {}
+        for coords in sorted(coordinates):
+            cache_key = cache_service.generate_packed_key(
+                'weather_current', '<dd', round(coords[0], 4), round(coords[1], 4)
+            )
+            cache_keys.setdefault(cache_key, []).append(coords)
         
-        tasks = {coords: fetch_with_limit(coords[0], coords[1]) for coords in coordinates}
+        cached = await cache_service.mget(list(cache_keys), cache_type='weather_data', serializer='msgpack')
+        missing_keys = [key for key in cache_keys if key not in cached]
+        # Points with a cached upstream failure are skipped until it expires
+        cached = {
+            key: value for key, value in cached.items()
+            if not cache_service.is_error_sentinel(value)
+        }
         
-        # Execute all tasks
-        completed_tasks = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        # Each request chunk succeeds or fails on its own, so one upstream error
+        # neither discards earlier chunks nor blocks points that were fetched
+        for i in range(0, len(missing_keys), self.max_points_per_request):
+            chunk_keys = missing_keys[i:i + self.max_points_per_request]
+            try:
+                fetched = await self._fetch_weather_chunk([cache_keys[key][0] for key in chunk_keys])
+            except Exception as e:
+                logger.warning(f"Weather fetch failed for {len(chunk_keys)} coordinates: {e}")
+                sentinel = cache_service.error_sentinel(_status_of(e))
+                for cache_key in chunk_keys:
+                    await cache_service.set(cache_key, sentinel, custom_ttl=cache_service.error_ttl, serializer='msgpack')
+                continue
+            
+            for cache_key, weather in zip(chunk_keys, fetched):
+                cached[cache_key] = weather
+                await cache_service.set(cache_key, weather, cache_type='weather_data', serializer='msgpack')
         
         # Map results back to coordinates
-        for coords, result in zip(coordinates, completed_tasks):
-            if result and not isinstance(result, Exception):
-                results[coords] = result
+        for cache_key, coords_list in cache_keys.items():
+            weather = cached.get(cache_key)
+            if weather:
+                for coords in coords_list:
+                    results[coords] = weather
         
         logger.info(f"Fetched weather for {len(results)}/{len(coordinates)} coordinates")
         return results
+
+# Shared instance so the HTTP connection pool is reused across requests
+weather_service = AsyncWeatherService()
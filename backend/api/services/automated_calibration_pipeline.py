@@ -1,7 +1,14 @@
 import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+from collections import Counter, OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime, timezone, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from .calibration_engine_service import CalibrationEngineService
@@ -12,65 +19,121 @@ from ..database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Columns streamed by the QC sweep, in DataFrame order
+_QC_COLUMNS = ('sensor_id', 'raw_pm2_5', 'raw_pm10', 'temperature', 'rh', 'pressure', 'timestamp_utc', 'source')
+
+def _next_chunk(rows: Iterator, size: int) -> List[tuple]:
+    """Read up to `size` rows from a streaming result"""
+    return [tuple(row) for row in islice(rows, size)]
+
+def _reference_fingerprint(reference_data: List[Dict]) -> bytes:
+    """Hash the numeric content of a reference dataset"""
+    values = np.array([
+        (point['raw_pm2_5'], point['reference_pm2_5'], point['rh'], point['temperature'])
+        for point in reference_data
+    ], dtype=np.float64)
+    return hashlib.blake2b(values.tobytes(), digest_size=16).digest()
+
+@dataclass
+class RunStats:
+    """Counters for a single pipeline run, merged into the totals once it ends"""
+    total_sensors_processed: int = 0
+    successful_calibrations: int = 0
+    qc_flags_applied: int = 0
+    harmonization_successes: int = 0
+    pipeline_errors: List[str] = field(default_factory=list)
+    
+    def merge(self, other: 'RunStats'):
+        """Add another run's counters to this one"""
+        self.total_sensors_processed += other.total_sensors_processed
+        self.successful_calibrations += other.successful_calibrations
+        self.qc_flags_applied += other.qc_flags_applied
+        self.harmonization_successes += other.harmonization_successes
+        self.pipeline_errors.extend(other.pipeline_errors)
+
 class AutomatedCalibrationPipeline:
     """Automated pipeline for sensor calibration and quality control"""
     
     def __init__(self):
-        self.pipeline_stats = {
-            'total_sensors_processed': 0,
-            'successful_calibrations': 0,
-            'qc_flags_applied': 0,
-            'harmonization_successes': 0,
-            'pipeline_errors': []
-        }
+        self.pipeline_stats = RunStats()
+        
+        # Services are configured once; each run binds its own session
+        self._calibration_service_template = CalibrationEngineService(None)
+        self._qc_service_template = SensorQCService(None)
+        self.qc_chunk_size = 5000
+        self.fit_cache_size = 4096
+        self._fit_cache: OrderedDict[Tuple[str, bytes], Dict] = OrderedDict()
     
-    async def run_daily_calibration_update(self, db: Session) -> Dict[str, Any]:
+    async def run_daily_calibration_update(self, db: Session, include_details: bool = False) -> Dict[str, Any]:
         """Run daily calibration updates for all sensors"""
         logger.info("Starting daily calibration update pipeline")
         
         try:
-            calibration_service = CalibrationEngineService(db)
+            calibration_service = self._calibration_service_template.with_session(db)
+            
+            # Read the clock once; cutoff, start and duration all derive from it
+            pipeline_start_dt = datetime.now(timezone.utc)
             
             # Get sensors that need recalibration
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
+            cutoff_date = pipeline_start_dt - timedelta(days=30)
             
-            sensors_needing_calibration = db.query(SensorCalibration).filter(
-                (SensorCalibration.last_calibrated < cutoff_date) |
-                (SensorCalibration.last_calibrated.is_(None))
-            ).all()
+            # Split the OR into two index-friendly branches. Plain rows rather
+            # than entities: batch commits expire entities, and refreshing them
+            # would cost one SELECT per sensor on the event loop thread
+            calibration_columns = (SensorCalibration.sensor_id, SensorCalibration.last_calibrated)
+            never_calibrated = db.query(*calibration_columns).filter(
+                SensorCalibration.last_calibrated.is_(None)
+            )
+            stale_calibrations = db.query(*calibration_columns).filter(
+                SensorCalibration.last_calibrated < cutoff_date
+            )
+            sensors_needing_calibration = await asyncio.to_thread(
+                never_calibrated.union_all(stale_calibrations).all
+            )
             
+            stats = RunStats()
+            status_counts = Counter()
+            recent_errors = deque(maxlen=50)
             pipeline_results = {
-                'pipeline_start': datetime.now(timezone.utc).isoformat(),
+                'pipeline_start': pipeline_start_dt.isoformat(),
                 'sensors_identified': len(sensors_needing_calibration),
-                'calibration_results': [],
                 'summary': {}
             }
+            if include_details:
+                pipeline_results['calibration_results'] = []
             
-            # Process sensors in batches to avoid overwhelming the system
+            # Process sensors in batches; each batch is fit in one stacked solve
             batch_size = 10
             for i in range(0, len(sensors_needing_calibration), batch_size):
                 batch = sensors_needing_calibration[i:i + batch_size]
                 
                 # Process batch
-                batch_results = await self._process_calibration_batch(batch, calibration_service)
-                pipeline_results['calibration_results'].extend(batch_results)
+                batch_results = await self._process_calibration_batch(
+                    batch, calibration_service, pipeline_start_dt, stats
+                )
                 
-                # Add small delay between batches
-                await asyncio.sleep(2)
+                status_counts.update(r.get('status') for r in batch_results)
+                recent_errors.extend(f"{r['sensor_id']}: {r['error']}" for r in batch_results if 'error' in r)
+                if include_details:
+                    pipeline_results['calibration_results'].extend(batch_results)
             
             # Calculate summary statistics
-            successful = len([r for r in pipeline_results['calibration_results'] if r.get('status') == 'success'])
-            failed = len([r for r in pipeline_results['calibration_results'] if r.get('status') == 'failed'])
+            successful = status_counts['success']
+            failed = status_counts['failed']
             
             pipeline_results['summary'] = {
                 'total_processed': len(sensors_needing_calibration),
                 'successful_calibrations': successful,
                 'failed_calibrations': failed,
                 'success_rate': successful / len(sensors_needing_calibration) if sensors_needing_calibration else 0,
-                'pipeline_duration_minutes': (datetime.now(timezone.utc) - 
-                                            datetime.fromisoformat(pipeline_results['pipeline_start'])).total_seconds() / 60
+                'status_counts': dict(status_counts),
+                'recent_errors': list(recent_errors),
+                'pipeline_duration_minutes': (datetime.now(timezone.utc) - pipeline_start_dt).total_seconds() / 60
             }
             
+            pipeline_results['run_stats'] = asdict(stats)
+            self.pipeline_stats.merge(stats)
+            
             logger.info(f"Daily calibration update completed: {successful}/{len(sensors_needing_calibration)} successful")
             
             return pipeline_results
@@ -79,80 +142,160 @@ class AutomatedCalibrationPipeline:
             logger.error(f"Daily calibration pipeline failed: {e}")
             return {'error': str(e)}
     
-    async def _process_calibration_batch(self, sensors: List, calibration_service: CalibrationEngineService) -> List[Dict]:
+    async def _process_calibration_batch(self, sensors: List, calibration_service: CalibrationEngineService,
+                                         calibrated_at: datetime, stats: RunStats) -> List[Dict]:
         """Process a batch of sensors for calibration"""
-        batch_results = []
+        results: Dict[str, Dict] = {}
+        fitted: Dict[str, Dict] = {}
+        reference_sets: Dict[str, List[Dict]] = {}
+        cache_keys: Dict[str, Tuple[str, bytes]] = {}
+        
+        # Generate reference data for the whole batch in one query
+        # (in production, query co-location database)
+        try:
+            batch_reference_data = await asyncio.to_thread(
+                calibration_service.get_reference_data_bulk, [sensor.sensor_id for sensor in sensors]
+            )
+        except Exception as e:
+            logger.error(f"Reference data lookup failed for batch of {len(sensors)} sensors: {e}")
+            stats.pipeline_errors.append(str(e))
+            return [
+                {'sensor_id': sensor.sensor_id, 'status': 'error', 'error': str(e)}
+                for sensor in sensors
+            ]
         
         for sensor in sensors:
             try:
-                # Generate reference data (in production, query co-location database)
-                reference_data = calibration_service._generate_mock_reference_data(sensor.sensor_id)
+                reference_data = batch_reference_data[sensor.sensor_id]
+                stats.total_sensors_processed += 1
                 
-                if len(reference_data) >= calibration_service.min_reference_points:
-                    # Fit calibration
-                    calibration_params = calibration_service.fit_calibration_model(
-                        sensor.sensor_id, reference_data
-                    )
-                    
-                    # Store parameters
-                    success = calibration_service.store_calibration_parameters(
-                        sensor.sensor_id, sensor.sensor_type, calibration_params
-                    )
-                    
-                    if success:
-                        batch_results.append({
-                            'sensor_id': sensor.sensor_id,
-                            'status': 'success',
-                            'r2': calibration_params.get('calibration_r2'),
-                            'sigma_i': calibration_params.get('sigma_i'),
-                            'reference_points': len(reference_data)
-                        })
-                        self.pipeline_stats['successful_calibrations'] += 1
-                    else:
-                        batch_results.append({
-                            'sensor_id': sensor.sensor_id,
-                            'status': 'failed',
-                            'error': 'Failed to store calibration parameters'
-                        })
-                else:
-                    batch_results.append({
+                if len(reference_data) < calibration_service.min_reference_points:
+                    results[sensor.sensor_id] = {
                         'sensor_id': sensor.sensor_id,
                         'status': 'insufficient_data',
                         'data_points': len(reference_data),
                         'required_points': calibration_service.min_reference_points
-                    })
+                    }
+                    continue
+                
+                # Reuse the previous fit when the reference data is unchanged
+                cache_key = (sensor.sensor_id, _reference_fingerprint(reference_data))
+                cached_params = self._get_cached_fit(cache_key, sensor.last_calibrated)
                 
-                self.pipeline_stats['total_sensors_processed'] += 1
+                if cached_params is not None:
+                    fitted[sensor.sensor_id] = {**cached_params, 'last_calibrated': calibrated_at}
+                else:
+                    reference_sets[sensor.sensor_id] = reference_data
+                cache_keys[sensor.sensor_id] = cache_key
+                results[sensor.sensor_id] = None
                 
             except Exception as e:
                 logger.error(f"Calibration failed for sensor {sensor.sensor_id}: {e}")
-                batch_results.append({
+                results[sensor.sensor_id] = {
                     'sensor_id': sensor.sensor_id,
                     'status': 'error',
                     'error': str(e)
-                })
-                self.pipeline_stats['pipeline_errors'].append(str(e))
+                }
+                stats.pipeline_errors.append(str(e))
         
-        return batch_results
+        # Fit every cache miss in one stacked solve off the event loop
+        if reference_sets:
+            try:
+                fitted.update(await asyncio.to_thread(
+                    calibration_service.fit_calibration_models_batch, reference_sets, calibrated_at
+                ))
+            except Exception as e:
+                logger.error(f"Batch calibration fit failed for {len(reference_sets)} sensors: {e}")
+                stats.pipeline_errors.append(str(e))
+                for sensor_id in reference_sets:
+                    results[sensor_id] = {
+                        'sensor_id': sensor_id,
+                        'status': 'error',
+                        'error': str(e)
+                    }
+        
+        # Store all fitted parameters for the batch in one round-trip
+        to_store = [sensor_id for sensor_id, result in results.items() if result is None]
+        if to_store:
+            sensor_types = {sensor.sensor_id: sensor.sensor_type for sensor in sensors}
+            success = await asyncio.to_thread(calibration_service.bulk_store_calibration_parameters, [
+                (sensor_id, sensor_types[sensor_id], fitted[sensor_id])
+                for sensor_id in to_store
+            ])
+            
+            for sensor_id in to_store:
+                calibration_params = fitted[sensor_id]
+                if success:
+                    self._put_cached_fit(cache_keys[sensor_id], calibration_params)
+                    stats.successful_calibrations += 1
+                    results[sensor_id] = {
+                        'sensor_id': sensor_id,
+                        'status': 'success',
+                        'r2': calibration_params.get('calibration_r2'),
+                        'sigma_i': calibration_params.get('sigma_i'),
+                        'reference_points': calibration_params.get('reference_count')
+                    }
+                else:
+                    results[sensor_id] = {
+                        'sensor_id': sensor_id,
+                        'status': 'failed',
+                        'error': 'Failed to store calibration parameters'
+                    }
+        
+        return list(results.values())
+    
+    def _get_cached_fit(self, key: Tuple[str, bytes], last_calibrated: Optional[datetime]) -> Optional[Dict]:
+        """Return cached calibration parameters unless the stored row is newer"""
+        cached = self._fit_cache.get(key)
+        if cached is None:
+            return None
+        
+        # Someone recalibrated the sensor since this fit was cached
+        if last_calibrated and last_calibrated > cached['last_calibrated']:
+            del self._fit_cache[key]
+            return None
+        
+        self._fit_cache.move_to_end(key)
+        return cached
+    
+    def _put_cached_fit(self, key: Tuple[str, bytes], calibration_params: Dict):
+        """Insert fitted parameters, evicting the least recently used entry"""
+        self._fit_cache[key] = calibration_params
+        self._fit_cache.move_to_end(key)
+        if len(self._fit_cache) > self.fit_cache_size:
+            self._fit_cache.popitem(last=False)
     
     async def run_qc_validation_sweep(self, db: Session, hours_back: int = 24) -> Dict[str, Any]:
         """Run quality control validation on recent sensor data"""
         logger.info(f"Starting QC validation sweep for last {hours_back} hours")
         
         try:
-            qc_service = SensorQCService(db)
+            qc_service = self._qc_service_template.with_session(db)
             harmonization_service = DataHarmonizationService()
             
+            validation_start_dt = datetime.now(timezone.utc)
+            
             # Get recent sensor data that needs QC validation
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+            cutoff_time = validation_start_dt - timedelta(hours=hours_back)
             
-            recent_sensors = db.query(SensorHarmonized).filter(
+            sweep_filter = (
                 SensorHarmonized.created_at >= cutoff_time,
                 SensorHarmonized.raw_pm2_5.isnot(None)
-            ).all()
+            )
+            total_sensors = await asyncio.to_thread(
+                db.query(func.count()).select_from(SensorHarmonized).filter(*sweep_filter).scalar
+            )
+            logger.info(f"QC validation sweep covers {total_sensors} sensor records")
+            
+            # Stream rows through a dedicated read session so the QC log
+            # commits on `db` don't close the server-side cursor mid-iteration
+            stream_session = Session(bind=db.get_bind())
+            recent_sensors = stream_session.query(
+                *(getattr(SensorHarmonized, column) for column in _QC_COLUMNS)
+            ).filter(*sweep_filter).yield_per(1000)
             
             qc_results = {
-                'validation_start': datetime.now(timezone.utc).isoformat(),
+                'validation_start': validation_start_dt.isoformat(),
                 'sensors_processed': 0,
                 'qc_flags_applied': 0,
                 'sensors_with_issues': 0,
@@ -160,51 +303,31 @@ class AutomatedCalibrationPipeline:
                 'processing_errors': []
             }
             
-            # Process each sensor record
-            for sensor_record in recent_sensors:
-                try:
-                    # Convert to dict format for QC processing
-                    sensor_data = {
-                        'sensor_id': sensor_record.sensor_id,
-                        'raw_pm2_5': float(sensor_record.raw_pm2_5) if sensor_record.raw_pm2_5 else None,
-                        'raw_pm10': float(sensor_record.raw_pm10) if sensor_record.raw_pm10 else None,
-                        'temperature': float(sensor_record.temperature) if sensor_record.temperature else None,
-                        'rh': float(sensor_record.rh) if sensor_record.rh else None,
-                        'pressure': float(sensor_record.pressure) if sensor_record.pressure else None,
-                        'timestamp_utc': sensor_record.timestamp_utc,
-                        'source': sensor_record.source
-                    }
-                    
-                    # Apply QC rules
-                    processed_data = qc_service.apply_qc_rules(sensor_data)
-                    
-                    # Count flags
-                    flags = processed_data.get('qc_flags', [])
-                    qc_results['qc_flags_applied'] += len(flags)
-                    
-                    if flags:
-                        qc_results['sensors_with_issues'] += 1
-                        
-                        # Count flag types
-                        for flag in flags:
-                            qc_results['flag_summary'][flag] = qc_results['flag_summary'].get(flag, 0) + 1
-                    
-                    qc_results['sensors_processed'] += 1
-                    
-                except Exception as e:
-                    qc_results['processing_errors'].append(f"Sensor {sensor_record.sensor_id}: {str(e)}")
-                    continue
+            # Pull and QC one chunk at a time in a worker thread; each step
+            # is awaited, so the sessions are never used concurrently
+            flag_counter = Counter()
+            try:
+                rows = await asyncio.to_thread(iter, recent_sensors)
+                while chunk := await asyncio.to_thread(_next_chunk, rows, self.qc_chunk_size):
+                    await asyncio.to_thread(self._apply_qc_chunk, qc_service, chunk, qc_results, flag_counter)
+            finally:
+                stream_session.close()
+            
+            # Unary plus drops the zero counts Counter.update keeps
+            flag_counter = +flag_counter
+            qc_results['flag_summary'] = dict(flag_counter)
             
             # Update pipeline stats
-            self.pipeline_stats['qc_flags_applied'] += qc_results['qc_flags_applied']
+            stats = RunStats(qc_flags_applied=qc_results['qc_flags_applied'])
+            self.pipeline_stats.merge(stats)
             
             # Calculate completion metrics
             qc_results['summary'] = {
-                'total_sensors': len(recent_sensors),
+                'total_sensors': total_sensors,
                 'processed_sensors': qc_results['sensors_processed'],
                 'sensors_with_issues': qc_results['sensors_with_issues'],
                 'issue_rate': qc_results['sensors_with_issues'] / qc_results['sensors_processed'] if qc_results['sensors_processed'] > 0 else 0,
-                'most_common_flags': sorted(qc_results['flag_summary'].items(), key=lambda x: x[1], reverse=True)[:5]
+                'most_common_flags': flag_counter.most_common(5)
             }
             
             logger.info(f"QC validation sweep completed: {qc_results['sensors_processed']} sensors processed, {qc_results['qc_flags_applied']} flags applied")
@@ -215,22 +338,33 @@ class AutomatedCalibrationPipeline:
             logger.error(f"QC validation sweep failed: {e}")
             return {'error': str(e)}
     
+    def _apply_qc_chunk(self, qc_service: SensorQCService, rows: List[tuple], qc_results: Dict[str, Any],
+                        flag_counter: Counter):
+        """Apply vectorized QC to a chunk of streamed rows and fold in the counts"""
+        try:
+            df = pd.DataFrame(rows, columns=_QC_COLUMNS)
+            mask = qc_service.apply_qc_rules_vectorized(df)
+            
+            flag_counts = mask.sum(axis=0).tolist()
+            flag_counter.update(dict(zip(qc_service.qc_flag_names, flag_counts)))
+            
+            qc_results['qc_flags_applied'] += sum(flag_counts)
+            qc_results['sensors_with_issues'] += int(mask.any(axis=1).sum())
+            qc_results['sensors_processed'] += len(rows)
+            
+        except Exception as e:
+            qc_results['processing_errors'].append(f"Chunk of {len(rows)} rows: {str(e)}")
+    
     def get_pipeline_statistics(self) -> Dict[str, Any]:
         """Get comprehensive pipeline statistics"""
         return {
-            'pipeline_stats': self.pipeline_stats.copy(),
+            'pipeline_stats': asdict(self.pipeline_stats),
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
     
     def reset_pipeline_statistics(self):
         """Reset pipeline statistics counters"""
-        self.pipeline_stats = {
-            'total_sensors_processed': 0,
-            'successful_calibrations': 0,
-            'qc_flags_applied': 0,
-            'harmonization_successes': 0,
-            'pipeline_errors': []
-        }
+        self.pipeline_stats = RunStats()
         logger.info("Pipeline statistics reset")
 
 # Singleton instance
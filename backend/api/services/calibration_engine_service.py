@@ -1,17 +1,60 @@
 from typing import Dict, List, Optional, Tuple, Any
 import numpy as np
 import pandas as pd
+import scipy.linalg
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_squared_error
-from sklearn.model_selection import LeaveOneOut
+import copy
 import logging
+import threading
+from collections import namedtuple
+from operator import attrgetter
+from cachetools import TTLCache
 
 from ..models.harmonized_models import SensorHarmonized, SensorCalibration
 
 logger = logging.getLogger(__name__)
 
+# Reading attributes consumed when simulating reference points, fetched in one call
+_REFERENCE_SOURCE_FIELDS = attrgetter('timestamp_utc', 'raw_pm2_5', 'rh', 'temperature')
+
+# Active calibration parameters as plain floats, shared across service instances
+CalParams = namedtuple('CalParams', 'alpha beta gamma delta sigma_i r2 last_calibrated')
+_active_calibration_cache = TTLCache(maxsize=10_000, ttl=300)
+_active_calibration_lock = threading.Lock()
+_NOT_CACHED = object()
+
+# Squared Cholesky pivots below this fraction of their column's norm mark XᵀX as singular
+_RANK_TOLERANCE = np.sqrt(np.finfo(np.float64).eps)
+
+# Points with 1 - h_ii below this are refitted explicitly instead of via PRESS
+_LEVERAGE_TOLERANCE = 1e-12
+
+def _corrected_concentrations(raw: np.ndarray, rh: np.ndarray, temperature: np.ndarray,
+                              alpha: float, beta: float, gamma: float, delta: float) -> np.ndarray:
+    """Evaluate c_corr = alpha + beta*c_raw + gamma*rh + delta*t over arrays, clipped at zero"""
+    return np.maximum(0.0, alpha + beta * raw + gamma * rh + delta * temperature)
+
+def _r2_score(y: np.ndarray, y_pred: np.ndarray) -> float:
+    """Coefficient of determination, 1.0 for a perfect fit of a constant target"""
+    ss_res = ((y - y_pred) ** 2).sum()
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    if ss_tot == 0:
+        return 1.0 if ss_res == 0 else 0.0
+    return 1.0 - ss_res / ss_tot
+
+def _held_out_errors(X: np.ndarray, y: np.ndarray, residuals: np.ndarray, leverages: np.ndarray) -> np.ndarray:
+    """Leave-one-out prediction errors -r_i / (1 - h_ii), refitting points with leverage near 1"""
+    gap = 1.0 - leverages
+    degenerate = gap < _LEVERAGE_TOLERANCE
+    errors = -residuals / np.where(degenerate, 1.0, gap)
+    for i in np.flatnonzero(degenerate):
+        # PRESS is undefined at h_ii = 1, so fit without the point directly
+        coeffs = np.linalg.lstsq(np.delete(X, i, axis=0), np.delete(y, i), rcond=None)[0]
+        errors[i] = X[i] @ coeffs - y[i]
+    return errors
+
 class CalibrationEngineService:
     """Service for sensor calibration model implementation"""
     
@@ -21,49 +64,44 @@ class CalibrationEngineService:
         self.min_reference_points = 10     # Minimum points for calibration
         self.max_calibration_age_days = 90  # Recalibrate if older than this
     
-    def fit_calibration_model(self, sensor_id: str, reference_data: List[Dict]) -> Dict:
+    def with_session(self, db_session: Session) -> 'CalibrationEngineService':
+        """Return a copy bound to another session, sharing the loaded configuration"""
+        bound = copy.copy(self)
+        bound.db = db_session
+        return bound
+    
+    def fit_calibration_model(self, sensor_id: str, reference_data: List[Dict],
+                              calibrated_at: Optional[datetime] = None) -> Dict:
         """Fit linear calibration: c_corr = alpha + beta*c_raw + gamma*rh + delta*t"""
         try:
             if len(reference_data) < self.min_reference_points:
                 raise ValueError(f"Insufficient reference data: {len(reference_data)} < {self.min_reference_points}")
             
-            # Prepare design matrix
-            X = []
-            y = []
-            
-            for data_point in reference_data:
-                # Design matrix: [1, c_raw, rh, temperature]
-                row = [
-                    1.0,  # intercept
-                    float(data_point.get('raw_pm2_5', 0)),
-                    float(data_point.get('rh', 50)),  # Default RH if missing
-                    float(data_point.get('temperature', 20))  # Default temp if missing
-                ]
-                X.append(row)
-                y.append(float(data_point['reference_pm2_5']))
+            # Design matrix: [1, c_raw, rh, temperature]
+            X, y = self._build_design_matrix(reference_data)
             
-            X = np.array(X)
-            y = np.array(y)
+            # Fit linear model via Cholesky-factored normal equations
+            coeffs, _, full_rank = self._solve_normal_equations(X, y)
             
-            # Fit linear model using least squares
-            coeffs, residuals, rank, singular_values = np.linalg.lstsq(X, y, rcond=None)
+            # Residuals are computed once and every metric derives from them
+            residuals = y - X @ coeffs
+            rss = residuals @ residuals
             
             # Calculate uncertainty (residual standard error)
             degrees_freedom = len(y) - X.shape[1]
-            if degrees_freedom > 0 and len(residuals) > 0:
-                sigma_i = np.sqrt(residuals[0] / degrees_freedom)
+            if degrees_freedom > 0 and full_rank:
+                sigma_i = np.sqrt(rss / degrees_freedom)
             else:
                 # Fallback calculation
-                y_pred = X @ coeffs
-                sigma_i = np.sqrt(np.mean((y - y_pred) ** 2))
+                sigma_i = np.sqrt(rss / len(y))
             
             # Calculate R-squared
-            y_pred = X @ coeffs
-            r2 = r2_score(y, y_pred)
+            ss_tot = ((y - y.mean()) ** 2).sum()
+            r2 = 1.0 - rss / ss_tot if ss_tot > 0 else float(rss == 0)
             
             # Calculate validation metrics
-            rmse = np.sqrt(mean_squared_error(y, y_pred))
-            bias = np.mean(y_pred - y)
+            rmse = np.sqrt(rss / len(y))
+            bias = -residuals.mean()
             
             calibration_params = {
                 'alpha': float(coeffs[0]),  # intercept
@@ -75,7 +113,7 @@ class CalibrationEngineService:
                 'validation_rmse': float(rmse),
                 'validation_bias': float(bias),
                 'reference_count': len(reference_data),
-                'last_calibrated': datetime.now(timezone.utc),
+                'last_calibrated': calibrated_at or datetime.now(timezone.utc),
                 'calibration_method': 'linear'
             }
             
@@ -88,107 +126,419 @@ class CalibrationEngineService:
             logger.error(f"Calibration fitting failed for sensor {sensor_id}: {e}")
             raise
     
+    def fit_calibration_models_batch(self, reference_sets: Dict[str, List[Dict]],
+                                     calibrated_at: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Fit the linear calibration for many sensors in one stacked least-squares solve"""
+        sensor_ids, counts, X, y, valid = self._stack_design_matrices(reference_sets)
+        if (counts < self.min_reference_points).any():
+            raise ValueError(f"Insufficient reference data: {counts.min()} < {self.min_reference_points}")
+        n_sensors = len(sensor_ids)
+        
+        coeffs, _, full_rank = self._solve_normal_equations_batch(X, y)
+        y_pred = np.einsum('bnk,bk->bn', X, coeffs)
+        errors = np.where(valid, y_pred - y, 0.0)
+        
+        ss_res = (errors ** 2).sum(axis=1)
+        y_mean = y.sum(axis=1) / counts
+        ss_tot = np.where(valid, (y - y_mean[:, None]) ** 2, 0.0).sum(axis=1)
+        
+        # Residual standard error, falling back to RMS for rank-deficient fits
+        degrees_freedom = counts - X.shape[2]
+        full_rank &= degrees_freedom > 0
+        sigma_i = np.sqrt(np.where(full_rank, ss_res / np.maximum(degrees_freedom, 1), ss_res / counts))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+        rmse = np.sqrt(ss_res / counts)
+        bias = errors.sum(axis=1) / counts
+        
+        last_calibrated = calibrated_at or datetime.now(timezone.utc)
+        logger.info(f"Batch calibration fitted for {n_sensors} sensors: mean R²={r2.mean():.3f}")
+        
+        return {
+            sensor_id: {
+                'alpha': float(coeffs[b, 0]),
+                'beta': float(coeffs[b, 1]),
+                'gamma': float(coeffs[b, 2]),
+                'delta': float(coeffs[b, 3]),
+                'sigma_i': float(sigma_i[b]),
+                'calibration_r2': float(r2[b]),
+                'validation_rmse': float(rmse[b]),
+                'validation_bias': float(bias[b]),
+                'reference_count': int(counts[b]),
+                'last_calibrated': last_calibrated,
+                'calibration_method': 'linear'
+            }
+            for b, sensor_id in enumerate(sensor_ids)
+        }
+    
+    def cross_validate_batch(self, reference_sets: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """Perform leave-one-out cross-validation for many sensors in one stacked solve"""
+        sensor_ids, counts, X, y, valid = self._stack_design_matrices(reference_sets)
+        if (counts < 5).any():
+            raise ValueError("Insufficient data for cross-validation")
+        
+        # Closed-form PRESS residuals r_i / (1 - h_ii); padded rows are masked out
+        coeffs, XtX_inv, _ = self._solve_normal_equations_batch(X, y)
+        leverages = np.einsum('bni,bij,bnj->bn', X, XtX_inv, X)
+        residuals = y - np.einsum('bnk,bk->bn', X, coeffs)
+        gap = np.where(valid, 1.0 - leverages, 1.0)
+        errors = np.where(valid, -residuals / np.where(gap < _LEVERAGE_TOLERANCE, 1.0, gap), 0.0)
+        for b in np.flatnonzero((gap < _LEVERAGE_TOLERANCE).any(axis=1)):
+            rows = valid[b]
+            errors[b, rows] = _held_out_errors(X[b, rows], y[b, rows], residuals[b, rows], leverages[b, rows])
+        
+        ss_res = (errors ** 2).sum(axis=1)
+        y_mean = y.sum(axis=1) / counts
+        ss_tot = np.where(valid, (y - y_mean[:, None]) ** 2, 0.0).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv_r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+        cv_rmse = np.sqrt(ss_res / counts)
+        cv_bias = errors.sum(axis=1) / counts
+        cv_mae = np.abs(errors).sum(axis=1) / counts
+        
+        return {
+            sensor_id: {
+                'sensor_id': sensor_id,
+                'cv_rmse': float(cv_rmse[b]),
+                'cv_r2': float(cv_r2[b]),
+                'cv_bias': float(cv_bias[b]),
+                'cv_mae': float(cv_mae[b]),
+                'n_folds': int(counts[b]),
+                'validation_type': 'leave_one_out'
+            }
+            for b, sensor_id in enumerate(sensor_ids)
+        }
+    
+    def _stack_design_matrices(self, reference_sets: Dict[str, List[Dict]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Stack per-sensor design matrices into zero-padded (sensors, rows, 4) tensors"""
+        sensor_ids = list(reference_sets)
+        counts = np.array([len(reference_sets[sensor_id]) for sensor_id in sensor_ids])
+        
+        # Zero-padded rows add nothing to XᵀX or Xᵀy, so shorter sensors
+        # get exactly their own least-squares solution
+        n_sensors, n_max = len(sensor_ids), int(counts.max())
+        X = np.zeros((n_sensors, n_max, 4))
+        y = np.zeros((n_sensors, n_max))
+        valid = np.zeros((n_sensors, n_max), dtype=bool)
+        
+        for b, sensor_id in enumerate(sensor_ids):
+            n = counts[b]
+            X[b, :n], y[b, :n] = self._build_design_matrix(reference_sets[sensor_id])
+            valid[b, :n] = True
+        
+        return sensor_ids, counts, X, y, valid
+    
+    def _solve_normal_equations_batch(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Solve stacked least-squares problems in one batched LAPACK call on XᵀX"""
+        XtX = np.einsum('bni,bnj->bij', X, X)
+        Xty = np.einsum('bni,bn->bi', X, y)
+        full_rank = np.linalg.matrix_rank(XtX) == X.shape[2]
+        
+        # Singular systems (e.g. constant RH) take the pseudo-inverse, which
+        # gives the same minimum-norm solution as lstsq
+        XtX_inv = np.empty_like(XtX)
+        identity = np.broadcast_to(np.eye(X.shape[2]), XtX[full_rank].shape)
+        XtX_inv[full_rank] = np.linalg.solve(XtX[full_rank], identity)
+        XtX_inv[~full_rank] = np.linalg.pinv(XtX[~full_rank])
+        
+        coeffs = np.einsum('bij,bj->bi', XtX_inv, Xty)
+        return coeffs, XtX_inv, full_rank
+    
+    def _solve_normal_equations(self, X: np.ndarray, y: np.ndarray,
+                                with_inverse: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray], bool]:
+        """Solve least squares via Cholesky on XᵀX, returning coefficients, (XᵀX)⁻¹ if requested and a full-rank flag"""
+        # One product over [X | y] yields every XᵀX and Xᵀy sum in a single pass
+        Z = np.column_stack([X, y])
+        gram = Z.T @ Z
+        XtX, Xty = gram[:-1, :-1], gram[:-1, -1]
+        try:
+            L = np.linalg.cholesky(XtX)
+            # Cholesky can succeed on round-off for a singular XᵀX; a squared pivot
+            # below sqrt(eps) of its column's norm marks a rank-deficient design.
+            # The design is only 4 columns wide, so compare the pivots as floats
+            if all(
+                pivot * pivot >= _RANK_TOLERANCE * norm
+                for pivot, norm in zip(L.diagonal().tolist(), XtX.diagonal().tolist())
+            ):
+                # Back-substitute through the factor with LAPACK directly rather
+                # than paying scipy's per-call validation
+                coeffs = scipy.linalg.lapack.dpotrs(L, Xty, lower=1)[0]
+                # Only the PRESS leverages need the inverse itself
+                XtX_inv = scipy.linalg.lapack.dpotrs(L, np.eye(X.shape[1]), lower=1)[0] if with_inverse else None
+                return coeffs, XtX_inv, True
+        except np.linalg.LinAlgError:
+            pass
+        
+        # Rank-deficient design (e.g. constant RH); QR with pivoting copes
+        coeffs = scipy.linalg.lstsq(X, y, lapack_driver='gelsy')[0]
+        return coeffs, np.linalg.pinv(XtX) if with_inverse else None, False
+    
+    def _build_design_matrix(self, reference_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the [1, c_raw, rh, temperature] design matrix and reference target"""
+        df = pd.DataFrame(reference_data, columns=['raw_pm2_5', 'rh', 'temperature', 'reference_pm2_5'])
+        
+        # Defaults for missing readings: no PM signal, 50% RH, 20°C
+        raw = df['raw_pm2_5'].fillna(0).to_numpy(np.float64)
+        rh = df['rh'].fillna(50).to_numpy(np.float64)
+        temperature = df['temperature'].fillna(20).to_numpy(np.float64)
+        
+        X = np.column_stack([np.ones(len(df)), raw, rh, temperature])
+        y = df['reference_pm2_5'].to_numpy(np.float64)
+        if np.isnan(y).any():
+            raise ValueError("Reference data is missing reference_pm2_5 values")
+        return X, y
+    
     def apply_calibration_correction(self, sensor_id: str, raw_data: Dict) -> Dict:
-        """Apply calibration correction to raw sensor data"""
+        """Apply calibration correction to raw sensor data, returning only the correction fields"""
         try:
-            # Get calibration parameters
-            calibration = self.db.query(SensorCalibration).filter(
-                SensorCalibration.sensor_id == sensor_id,
-                SensorCalibration.is_active == True
-            ).first()
-            
-            corrected_data = raw_data.copy()
+            raw_pm25 = raw_data.get('raw_pm2_5')
+            batch = self.apply_calibration_correction_batch(sensor_id, {
+                'raw_pm2_5': [raw_pm25],
+                'rh': [raw_data.get('rh', 50)],  # Default humidity
+                'temperature': [raw_data.get('temperature', 20)]  # Default temperature
+            })
             
-            if not calibration:
+            if batch['calibration_status'] == 'no_calibration':
                 # No calibration available, use raw values
-                corrected_data['pm2_5_corrected'] = raw_data.get('raw_pm2_5')
-                corrected_data['calibration_applied'] = False
-                corrected_data['sigma_i'] = 10.0  # Default uncertainty
-                corrected_data['calibration_status'] = 'no_calibration'
-                return corrected_data
-            
-            # Check if calibration is recent enough
-            if calibration.last_calibrated:
-                age_days = (datetime.now(timezone.utc) - calibration.last_calibrated).days
-                if age_days > self.max_calibration_age_days:
-                    logger.warning(f"Calibration for sensor {sensor_id} is {age_days} days old")
+                return {
+                    'pm2_5_corrected': raw_pm25,
+                    'calibration_applied': False,
+                    'sigma_i': batch['sigma_i'],
+                    'calibration_status': 'no_calibration'
+                }
             
-            # Apply linear calibration
-            raw_pm25 = raw_data.get('raw_pm2_5')
             if raw_pm25 is not None:
-                rh = raw_data.get('rh', 50)  # Default humidity
-                temperature = raw_data.get('temperature', 20)  # Default temperature
-                
-                # c_corr = alpha + beta*c_raw + gamma*rh + delta*t
-                c_corrected = (
-                    float(calibration.alpha) +
-                    float(calibration.beta) * float(raw_pm25) +
-                    float(calibration.gamma) * float(rh) +
-                    float(calibration.delta) * float(temperature)
-                )
-                
-                # Ensure corrected value is non-negative
-                c_corrected = max(0.0, c_corrected)
-                
-                corrected_data['pm2_5_corrected'] = round(c_corrected, 2)
-                corrected_data['calibration_applied'] = True
-                corrected_data['sigma_i'] = float(calibration.sigma_i)
-                corrected_data['calibration_r2'] = float(calibration.calibration_r2) if calibration.calibration_r2 else None
-                corrected_data['calibration_status'] = 'active'
-                corrected_data['last_calibrated'] = calibration.last_calibrated.isoformat() if calibration.last_calibrated else None
-            else:
-                corrected_data['pm2_5_corrected'] = None
-                corrected_data['calibration_applied'] = False
-                corrected_data['calibration_status'] = 'no_raw_data'
+                return {
+                    'pm2_5_corrected': float(batch['pm2_5_corrected'][0]),
+                    'calibration_applied': True,
+                    'sigma_i': batch['sigma_i'],
+                    'calibration_r2': batch['calibration_r2'],
+                    'calibration_status': 'active',
+                    'last_calibrated': batch['last_calibrated']
+                }
             
-            return corrected_data
+            return {
+                'pm2_5_corrected': None,
+                'calibration_applied': False,
+                'calibration_status': 'no_raw_data'
+            }
             
         except Exception as e:
             logger.error(f"Calibration application failed for sensor {sensor_id}: {e}")
-            # Return uncalibrated data with error status
-            corrected_data = raw_data.copy()
-            corrected_data['pm2_5_corrected'] = raw_data.get('raw_pm2_5')
-            corrected_data['calibration_applied'] = False
-            corrected_data['calibration_error'] = str(e)
-            corrected_data['calibration_status'] = 'error'
-            return corrected_data
+            # Return uncalibrated value with error status
+            return {
+                'pm2_5_corrected': raw_data.get('raw_pm2_5'),
+                'calibration_applied': False,
+                'calibration_error': str(e),
+                'calibration_status': 'error'
+            }
+    
+    def apply_calibration_correction_batch(self, sensor_id: str, readings: Any) -> Dict[str, Any]:
+        """Apply one sensor's calibration to many readings (DataFrame or dict of arrays)"""
+        raw = np.asarray(readings['raw_pm2_5'], dtype=np.float64)
+        
+        calibration = self._get_active_calibration(sensor_id)
+        
+        if not calibration:
+            return {
+                'pm2_5_corrected': raw,
+                'calibration_applied': np.zeros(raw.shape, dtype=bool),
+                'sigma_i': 10.0,  # Default uncertainty
+                'calibration_r2': None,
+                'last_calibrated': None,
+                'calibration_status': 'no_calibration'
+            }
+        
+        # Check if calibration is recent enough
+        if calibration.last_calibrated:
+            age_days = (datetime.now(timezone.utc) - calibration.last_calibrated).days
+            if age_days > self.max_calibration_age_days:
+                logger.warning(f"Calibration for sensor {sensor_id} is {age_days} days old")
+        
+        def column(name: str, default: float) -> np.ndarray:
+            values = readings[name] if name in readings else None
+            if values is None:
+                return np.full(raw.shape, default)
+            values = np.asarray(values, dtype=np.float64)
+            return np.where(np.isnan(values), default, values)
+        
+        rh = column('rh', 50.0)
+        temperature = column('temperature', 20.0)
+        
+        # c_corr = alpha + beta*c_raw + gamma*rh + delta*t, clipped at zero;
+        # NaN raw readings stay NaN
+        corrected = np.round(_corrected_concentrations(
+            raw, rh, temperature,
+            calibration.alpha, calibration.beta, calibration.gamma, calibration.delta
+        ), 2)
+        
+        return {
+            'pm2_5_corrected': corrected,
+            'calibration_applied': ~np.isnan(raw),
+            'sigma_i': calibration.sigma_i,
+            'calibration_r2': calibration.r2,
+            'last_calibrated': calibration.last_calibrated.isoformat() if calibration.last_calibrated else None,
+            'calibration_status': 'active'
+        }
+    
+    def _get_active_calibration(self, sensor_id: str) -> Optional[CalParams]:
+        """Get a sensor's active calibration, served from the TTL cache when possible"""
+        with _active_calibration_lock:
+            cached = _active_calibration_cache.get(sensor_id, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+        
+        calibration = self.db.query(SensorCalibration).filter(
+            SensorCalibration.sensor_id == sensor_id,
+            SensorCalibration.is_active == True
+        ).first()
+        
+        # Missing calibrations are cached too, so uncalibrated sensors skip the query
+        params = None
+        if calibration:
+            params = CalParams(
+                alpha=float(calibration.alpha),
+                beta=float(calibration.beta),
+                gamma=float(calibration.gamma),
+                delta=float(calibration.delta),
+                sigma_i=float(calibration.sigma_i),
+                r2=float(calibration.calibration_r2) if calibration.calibration_r2 else None,
+                last_calibrated=calibration.last_calibrated
+            )
+        
+        with _active_calibration_lock:
+            _active_calibration_cache[sensor_id] = params
+        return params
+    
+    @staticmethod
+    def _invalidate_active_calibrations(sensor_ids: List[str]) -> None:
+        """Drop cached calibration parameters after a write"""
+        with _active_calibration_lock:
+            for sensor_id in sensor_ids:
+                _active_calibration_cache.pop(sensor_id, None)
     
     def store_calibration_parameters(self, sensor_id: str, sensor_type: str, 
-                                   calibration_params: Dict) -> bool:
+                                   calibration_params: Dict, commit: bool = True) -> bool:
         """Store or update calibration parameters in database"""
         try:
-            # Check if calibration exists
-            existing_calibration = self.db.query(SensorCalibration).filter(
-                SensorCalibration.sensor_id == sensor_id
-            ).first()
-            
-            if existing_calibration:
-                # Update existing calibration
-                for key, value in calibration_params.items():
-                    if hasattr(existing_calibration, key):
-                        setattr(existing_calibration, key, value)
-                existing_calibration.updated_at = datetime.now(timezone.utc)
-                
-                logger.info(f"Updated calibration for sensor {sensor_id}")
-            else:
-                # Create new calibration
-                new_calibration = SensorCalibration(
-                    sensor_id=sensor_id,
-                    sensor_type=sensor_type,
-                    **calibration_params
-                )
-                self.db.add(new_calibration)
+            # The savepoint lets one failed sensor roll back without
+            # discarding the rest of an uncommitted batch
+            with self.db.begin_nested():
+                # Check if calibration exists
+                existing_calibration = self.db.query(SensorCalibration).filter(
+                    SensorCalibration.sensor_id == sensor_id
+                ).first()
                 
-                logger.info(f"Created new calibration for sensor {sensor_id}")
+                if existing_calibration:
+                    # Update existing calibration
+                    for key, value in calibration_params.items():
+                        if hasattr(existing_calibration, key):
+                            setattr(existing_calibration, key, value)
+                    existing_calibration.updated_at = datetime.now(timezone.utc)
+                    
+                    logger.info(f"Updated calibration for sensor {sensor_id}")
+                else:
+                    # Create new calibration
+                    new_calibration = SensorCalibration(
+                        sensor_id=sensor_id,
+                        sensor_type=sensor_type,
+                        **calibration_params
+                    )
+                    self.db.add(new_calibration)
+                    
+                    logger.info(f"Created new calibration for sensor {sensor_id}")
             
-            self.db.commit()
+            if commit:
+                self.db.commit()
+            self._invalidate_active_calibrations([sensor_id])
             return True
             
         except Exception as e:
             logger.error(f"Failed to store calibration for sensor {sensor_id}: {e}")
+            if commit:
+                self.db.rollback()
+            return False
+    
+    def build_update_dict(self, sensor_id: str, calibration_params: Dict) -> Dict:
+        """Build a SensorCalibration update mapping without touching the session"""
+        mapping = {
+            key: value for key, value in calibration_params.items()
+            if hasattr(SensorCalibration, key)
+        }
+        mapping['sensor_id'] = sensor_id
+        mapping['updated_at'] = datetime.now(timezone.utc)
+        return mapping
+    
+    def bulk_store_calibration_parameters(self, calibrations: List[Tuple[str, str, Dict]],
+                                          chunk_size: int = 500) -> bool:
+        """Store or update many sensors' calibrations with one lookup and one commit"""
+        if not calibrations:
+            return True
+        sensor_ids = [sensor_id for sensor_id, _, _ in calibrations]
+        
+        try:
+            existing_ids = set()
+            for i in range(0, len(sensor_ids), chunk_size):
+                existing_ids.update(sensor_id for (sensor_id,) in self.db.query(SensorCalibration.sensor_id).filter(
+                    SensorCalibration.sensor_id.in_(sensor_ids[i:i + chunk_size])
+                ))
+            
+            # Partition into updates of existing rows and inserts of new ones
+            updates, inserts = [], []
+            for sensor_id, sensor_type, calibration_params in calibrations:
+                mapping = self.build_update_dict(sensor_id, calibration_params)
+                if sensor_id in existing_ids:
+                    updates.append(mapping)
+                else:
+                    mapping['sensor_type'] = sensor_type
+                    inserts.append(mapping)
+            
+            if updates:
+                raw_connection = self.db.connection().connection.driver_connection
+                if hasattr(raw_connection, 'pipeline'):
+                    # psycopg 3: send every UPDATE before waiting on any reply
+                    self._pipeline_update_calibrations(raw_connection, updates)
+                else:
+                    self.db.bulk_update_mappings(SensorCalibration, updates)
+            if inserts:
+                self.db.bulk_insert_mappings(SensorCalibration, inserts)
+            self.db.commit()
+            self._invalidate_active_calibrations(sensor_ids)
+            
+            logger.info(f"Stored calibration for {len(calibrations)} sensors: "
+                       f"{len(updates)} updated, {len(inserts)} created")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store calibration batch of {len(calibrations)} sensors: {e}")
             self.db.rollback()
             return False
     
+    def _pipeline_update_calibrations(self, raw_connection, mappings: List[Dict]) -> None:
+        """Execute calibration UPDATEs inside a psycopg pipeline block"""
+        if not mappings:
+            return
+        
+        # Mappings may carry different parameters, so each distinct key set
+        # gets its own SET list rather than reusing the first mapping's
+        statements, queued = {}, []
+        for mapping in mappings:
+            columns = tuple(key for key in mapping if key != 'sensor_id')
+            statement = statements.get(columns)
+            if statement is None:
+                assignments = ', '.join(f"{column} = %({column})s" for column in columns)
+                statement = statements[columns] = (
+                    f"UPDATE {SensorCalibration.__tablename__} SET {assignments} "
+                    f"WHERE sensor_id = %(sensor_id)s"
+                )
+            queued.append((statement, mapping))
+        
+        with raw_connection.pipeline():
+            with raw_connection.cursor() as cursor:
+                for statement, mapping in queued:
+                    cursor.execute(statement, mapping)
+    
     def perform_cross_validation(self, sensor_id: str, reference_data: List[Dict]) -> Dict:
         """Perform leave-one-out cross-validation for calibration"""
         try:
@@ -196,45 +546,20 @@ class CalibrationEngineService:
                 return {'error': 'Insufficient data for cross-validation'}
             
             # Prepare data
-            X = []
-            y = []
-            for data_point in reference_data:
-                row = [
-                    1.0,
-                    float(data_point.get('raw_pm2_5', 0)),
-                    float(data_point.get('rh', 50)),
-                    float(data_point.get('temperature', 20))
-                ]
-                X.append(row)
-                y.append(float(data_point['reference_pm2_5']))
-            
-            X = np.array(X)
-            y = np.array(y)
-            
-            # Leave-one-out cross-validation
-            loo = LeaveOneOut()
-            predictions = []
-            observations = []
-            
-            for train_idx, test_idx in loo.split(X):
-                X_train, X_test = X[train_idx], X[test_idx]
-                y_train, y_test = y[train_idx], y[test_idx]
-                
-                # Fit model on training data
-                coeffs = np.linalg.lstsq(X_train, y_train, rcond=None)[0]
-                
-                # Predict on test data
-                y_pred = X_test @ coeffs
-                
-                predictions.extend(y_pred)
-                observations.extend(y_test)
+            X, y = self._build_design_matrix(reference_data)
             
-            predictions = np.array(predictions)
-            observations = np.array(observations)
+            # Leave-one-out cross-validation in closed form (PRESS identity):
+            # the held-out residual of point i is r_i / (1 - h_ii)
+            coeffs, XtX_inv, _ = self._solve_normal_equations(X, y, with_inverse=True)
+            leverages = np.einsum('ij,jk,ik->i', X, XtX_inv, X)
+            residuals = y - X @ coeffs
+            
+            predictions = y + _held_out_errors(X, y, residuals, leverages)
+            observations = y
             
             # Calculate cross-validation metrics
-            cv_rmse = np.sqrt(mean_squared_error(observations, predictions))
-            cv_r2 = r2_score(observations, predictions)
+            cv_rmse = np.sqrt(((observations - predictions) ** 2).mean())
+            cv_r2 = _r2_score(observations, predictions)
             cv_bias = np.mean(predictions - observations)
             cv_mae = np.mean(np.abs(predictions - observations))
             
@@ -255,8 +580,9 @@ class CalibrationEngineService:
     def auto_calibrate_sensors(self, source_filter: Optional[str] = None) -> Dict:
         """Automatically calibrate sensors that need recalibration"""
         try:
-            # Find sensors that need calibration
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.max_calibration_age_days)
+            # Find sensors that need calibration; one timestamp serves the whole run
+            now = datetime.now(timezone.utc)
+            cutoff_date = now - timedelta(days=self.max_calibration_age_days)
             
             query = self.db.query(SensorCalibration).filter(
                 (SensorCalibration.last_calibrated < cutoff_date) |
@@ -264,12 +590,11 @@ class CalibrationEngineService:
             )
             
             if source_filter:
-                # Filter by source
-                sensor_ids = self.db.query(SensorHarmonized.sensor_id).filter(
+                # Filter by source with a join on the database side
+                source_sensors = self.db.query(SensorHarmonized.sensor_id).filter(
                     SensorHarmonized.source == source_filter
-                ).distinct().all()
-                sensor_id_list = [sid[0] for sid in sensor_ids]
-                query = query.filter(SensorCalibration.sensor_id.in_(sensor_id_list))
+                ).distinct().subquery()
+                query = query.join(source_sensors, SensorCalibration.sensor_id == source_sensors.c.sensor_id)
             
             sensors_to_calibrate = query.all()
             
@@ -280,45 +605,62 @@ class CalibrationEngineService:
                 'results': []
             }
             
+            # Generate reference data for every sensor in one grouped query
+            # (in production, this would come from co-location studies)
+            reference_sets = self.get_reference_data_bulk(
+                [sensor_calibration.sensor_id for sensor_calibration in sensors_to_calibrate]
+            )
+            
+            # Fit every sensor with enough data in one stacked solve; on failure
+            # each sensor falls back to its own fit below
+            fit_sets = {
+                sensor_id: reference_data for sensor_id, reference_data in reference_sets.items()
+                if len(reference_data) >= self.min_reference_points
+            }
+            fitted, validated = {}, {}
+            if fit_sets:
+                try:
+                    fitted = self.fit_calibration_models_batch(fit_sets, calibrated_at=now)
+                except Exception as e:
+                    logger.warning(f"Batch calibration fit failed, fitting sensors individually: {e}")
+                try:
+                    validated = self.cross_validate_batch(fit_sets)
+                except Exception as e:
+                    logger.warning(f"Batch cross-validation failed, validating sensors individually: {e}")
+            
+            calibrations, pending_results = [], []
             for sensor_calibration in sensors_to_calibrate:
                 try:
-                    # Generate reference data (in production, this would come from co-location studies)
-                    reference_data = self._generate_mock_reference_data(sensor_calibration.sensor_id)
+                    reference_data = reference_sets[sensor_calibration.sensor_id]
                     
                     if len(reference_data) >= self.min_reference_points:
                         # Fit calibration model
-                        calibration_params = self.fit_calibration_model(
+                        calibration_params = fitted.get(sensor_calibration.sensor_id) or self.fit_calibration_model(
                             sensor_calibration.sensor_id, 
+                            reference_data,
+                            calibrated_at=now
+                        )
+                        
+                        # Perform cross-validation
+                        cv_results = validated.get(sensor_calibration.sensor_id) or self.perform_cross_validation(
+                            sensor_calibration.sensor_id,
                             reference_data
                         )
                         
-                        # Store calibration parameters
-                        success = self.store_calibration_parameters(
+                        # Stored together with the rest of the batch below
+                        calibrations.append((
                             sensor_calibration.sensor_id,
                             sensor_calibration.sensor_type,
                             calibration_params
-                        )
-                        
-                        if success:
-                            # Perform cross-validation
-                            cv_results = self.perform_cross_validation(
-                                sensor_calibration.sensor_id,
-                                reference_data
-                            )
-                            
-                            calibration_results['successful_calibrations'] += 1
-                            calibration_results['results'].append({
-                                'sensor_id': sensor_calibration.sensor_id,
-                                'status': 'success',
-                                'calibration': calibration_params,
-                                'validation': cv_results
-                            })
-                        else:
-                            calibration_results['failed_calibrations'] += 1
-                            calibration_results['results'].append({
-                                'sensor_id': sensor_calibration.sensor_id,
-                                'status': 'storage_failed'
-                            })
+                        ))
+                        result = {
+                            'sensor_id': sensor_calibration.sensor_id,
+                            'status': 'success',
+                            'calibration': calibration_params,
+                            'validation': cv_results
+                        }
+                        pending_results.append(result)
+                        calibration_results['results'].append(result)
                     else:
                         calibration_results['results'].append({
                             'sensor_id': sensor_calibration.sensor_id,
@@ -337,6 +679,15 @@ class CalibrationEngineService:
                 
                 calibration_results['sensors_processed'] += 1
             
+            # One existence lookup, bulk update/insert and commit for every fit above
+            if self.bulk_store_calibration_parameters(calibrations):
+                calibration_results['successful_calibrations'] += len(pending_results)
+            else:
+                calibration_results['failed_calibrations'] += len(pending_results)
+                for result in pending_results:
+                    result['status'] = 'storage_failed'
+                    del result['calibration'], result['validation']
+            
             logger.info(f"Auto-calibration completed: {calibration_results['successful_calibrations']}/{calibration_results['sensors_processed']} successful")
             
             return calibration_results
@@ -356,23 +707,29 @@ class CalibrationEngineService:
                 return {'error': 'No calibration found'}
             
             # Get recent sensor data for analysis
-            recent_cutoff = datetime.now(timezone.utc) - timedelta(days=7)
-            
-            recent_data = self.db.query(SensorHarmonized).filter(
+            now = datetime.now(timezone.utc)
+            recent_cutoff = now - timedelta(days=7)
+            
+            # Calculate recent statistics in the database; no rows reach Python
+            mean_pm25, std_pm25, min_pm25, max_pm25, data_points = self.db.query(
+                func.avg(SensorHarmonized.raw_pm2_5),
+                func.stddev_pop(SensorHarmonized.raw_pm2_5),
+                func.min(SensorHarmonized.raw_pm2_5),
+                func.max(SensorHarmonized.raw_pm2_5),
+                func.count(SensorHarmonized.raw_pm2_5)
+            ).filter(
                 SensorHarmonized.sensor_id == sensor_id,
                 SensorHarmonized.timestamp_utc >= recent_cutoff,
                 SensorHarmonized.raw_pm2_5.isnot(None)
-            ).all()
+            ).one()
             
-            # Calculate recent statistics
-            if recent_data:
-                pm25_values = [float(r.raw_pm2_5) for r in recent_data]
+            if data_points:
                 recent_stats = {
-                    'mean_pm25': np.mean(pm25_values),
-                    'std_pm25': np.std(pm25_values),
-                    'min_pm25': np.min(pm25_values),
-                    'max_pm25': np.max(pm25_values),
-                    'data_points': len(pm25_values)
+                    'mean_pm25': float(mean_pm25),
+                    'std_pm25': float(std_pm25),
+                    'min_pm25': float(min_pm25),
+                    'max_pm25': float(max_pm25),
+                    'data_points': data_points
                 }
             else:
                 recent_stats = {'data_points': 0}
@@ -380,7 +737,7 @@ class CalibrationEngineService:
             # Calculate calibration age
             age_days = None
             if calibration.last_calibrated:
-                age_days = (datetime.now(timezone.utc) - calibration.last_calibrated).days
+                age_days = (now - calibration.last_calibrated).days
             
             return {
                 'sensor_id': sensor_id,
@@ -419,41 +776,85 @@ class CalibrationEngineService:
         recent_cutoff = datetime.now(timezone.utc) - timedelta(days=self.calibration_window_days)
         
         # Get recent sensor data
-        sensor_data = self.db.query(SensorHarmonized).filter(
+        sensor_data = self.db.query(
+            SensorHarmonized.timestamp_utc,
+            SensorHarmonized.raw_pm2_5,
+            SensorHarmonized.rh,
+            SensorHarmonized.temperature
+        ).filter(
             SensorHarmonized.sensor_id == sensor_id,
             SensorHarmonized.timestamp_utc >= recent_cutoff,
             SensorHarmonized.raw_pm2_5.isnot(None)
         ).limit(50).all()
         
-        reference_data = []
-        for record in sensor_data:
-            raw_pm25 = float(record.raw_pm2_5)
-            
-            # Simulate reference measurement with realistic bias patterns
-            # Low-cost sensors typically read high, especially at high concentrations
-            if raw_pm25 > 35:
-                bias_factor = 0.75  # High bias at high concentrations
-                noise_std = 3.0
-            elif raw_pm25 > 15:
-                bias_factor = 0.85  # Moderate bias
-                noise_std = 2.0
-            else:
-                bias_factor = 0.95  # Low bias at low concentrations
-                noise_std = 1.5
-            
-            # Add realistic noise and bias
-            reference_pm25 = raw_pm25 * bias_factor + np.random.normal(0, noise_std)
-            reference_pm25 = max(0, reference_pm25)  # Ensure non-negative
-            
-            reference_data.append({
-                'timestamp': record.timestamp_utc,
-                'raw_pm2_5': raw_pm25,
-                'reference_pm2_5': reference_pm25,
-                'rh': float(record.rh) if record.rh else 50,
-                'temperature': float(record.temperature) if record.temperature else 20
-            })
+        return self._simulate_reference_points(sensor_data)
+    
+    def get_reference_data_bulk(self, sensor_ids: List[str], chunk_size: int = 500) -> Dict[str, List[Dict]]:
+        """Fetch reference data for many sensors with one query per chunk of ids"""
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(days=self.calibration_window_days)
+        reference_sets = {sensor_id: [] for sensor_id in sensor_ids}
+        
+        for i in range(0, len(sensor_ids), chunk_size):
+            ranked = self.db.query(
+                SensorHarmonized.sensor_id,
+                SensorHarmonized.timestamp_utc,
+                SensorHarmonized.raw_pm2_5,
+                SensorHarmonized.rh,
+                SensorHarmonized.temperature,
+                func.row_number().over(
+                    partition_by=SensorHarmonized.sensor_id,
+                    order_by=SensorHarmonized.timestamp_utc.desc()
+                ).label('recency')
+            ).filter(
+                SensorHarmonized.sensor_id.in_(sensor_ids[i:i + chunk_size]),
+                SensorHarmonized.timestamp_utc >= recent_cutoff,
+                SensorHarmonized.raw_pm2_5.isnot(None)
+            ).subquery()
+            
+            records = self.db.query(ranked).filter(
+                ranked.c.recency <= 50
+            ).order_by(ranked.c.sensor_id, ranked.c.recency).all()
+            
+            for record, reference_point in zip(records, self._simulate_reference_points(records)):
+                reference_sets[record.sensor_id].append(reference_point)
+        
+        return reference_sets
+    
+    def _simulate_reference_points(self, records) -> List[Dict]:
+        """Pair raw sensor readings with simulated co-located reference values"""
+        if not records:
+            return []
+        timestamps, raw_pm25, rh, temperature = zip(*map(_REFERENCE_SOURCE_FIELDS, records))
+        raw_pm25 = np.array(raw_pm25, dtype=np.float64)
+        rh = np.array(rh, dtype=np.float64)
+        temperature = np.array(temperature, dtype=np.float64)
+        
+        # Simulate reference measurement with realistic bias patterns
+        # Low-cost sensors typically read high, especially at high concentrations
+        concentration_bands = [raw_pm25 > 35, raw_pm25 > 15]
+        bias_factor = np.select(concentration_bands, [0.75, 0.85], default=0.95)
+        noise_std = np.select(concentration_bands, [3.0, 2.0], default=1.5)
         
-        return reference_data
+        # Add realistic noise and bias, keeping the reference non-negative
+        noise = np.random.default_rng().standard_normal(raw_pm25.size) * noise_std
+        reference_pm25 = np.maximum(0.0, raw_pm25 * bias_factor + noise)
+        
+        # Missing or zero readings fall back to 50% RH and 20°C
+        rh = np.where(np.isnan(rh) | (rh == 0), 50.0, rh)
+        temperature = np.where(np.isnan(temperature) | (temperature == 0), 20.0, temperature)
+        
+        return [
+            {
+                'timestamp': timestamp,
+                'raw_pm2_5': raw,
+                'reference_pm2_5': reference,
+                'rh': humidity,
+                'temperature': temp
+            }
+            for timestamp, raw, reference, humidity, temp in zip(
+                timestamps, raw_pm25.tolist(), reference_pm25.tolist(), rh.tolist(), temperature.tolist()
+            )
+        ]
     
     def detect_calibration_drift(self, sensor_id: str, days_back: int = 30) -> Dict:
         """Detect if sensor calibration has drifted"""
@@ -468,7 +869,11 @@ class CalibrationEngineService:
             
             # Get recent data
             recent_cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
-            recent_data = self.db.query(SensorHarmonized).filter(
+            recent_data = self.db.query(
+                SensorHarmonized.raw_pm2_5,
+                SensorHarmonized.rh,
+                SensorHarmonized.temperature
+            ).filter(
                 SensorHarmonized.sensor_id == sensor_id,
                 SensorHarmonized.timestamp_utc >= recent_cutoff,
                 SensorHarmonized.raw_pm2_5.isnot(None)
@@ -477,27 +882,22 @@ class CalibrationEngineService:
             if len(recent_data) < 10:
                 return {'warning': 'Insufficient recent data for drift detection'}
             
-            # Apply current calibration
-            corrected_values = []
-            raw_values = []
-            
-            for record in recent_data:
-                raw_pm25 = float(record.raw_pm2_5)
-                rh = float(record.rh) if record.rh else 50
-                temp = float(record.temperature) if record.temperature else 20
-                
-                corrected = (
-                    float(calibration.alpha) +
-                    float(calibration.beta) * raw_pm25 +
-                    float(calibration.gamma) * rh +
-                    float(calibration.delta) * temp
-                )
-                
-                corrected_values.append(max(0, corrected))
-                raw_values.append(raw_pm25)
+            # Apply current calibration; NULL columns arrive as NaN, and missing
+            # or zero readings fall back to 50% RH and 20°C
+            readings = np.array(recent_data, dtype=np.float64)
+            raw_values, rh, temperature = readings[:, 0], readings[:, 1], readings[:, 2]
+            
+            corrected_values = _corrected_concentrations(
+                raw_values,
+                np.where(np.isnan(rh) | (rh == 0), 50.0, rh),
+                np.where(np.isnan(temperature) | (temperature == 0), 20.0, temperature),
+                float(calibration.alpha), float(calibration.beta),
+                float(calibration.gamma), float(calibration.delta)
+            )
             
-            # Calculate drift metrics
-            correction_factors = np.array(corrected_values) / np.array(raw_values)
+            # Calculate drift metrics; zero raw readings have no defined factor
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correction_factors = np.where(raw_values != 0, corrected_values / raw_values, np.nan)
             correction_factors = correction_factors[~np.isnan(correction_factors)]
             
             if len(correction_factors) > 0:
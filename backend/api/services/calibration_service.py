@@ -1,16 +1,42 @@
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 import numpy as np
-import pandas as pd
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_squared_error
+import copy
 import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 
+from .calibration_engine_service import CalibrationEngineService
 from ..models.harmonized_models import SensorHarmonized, SensorCalibration
 
 logger = logging.getLogger(__name__)
 
+# Active calibration coefficients converted to plain floats once per load,
+# cached per process so streaming ingestion skips the per-record query
+ActiveCalibration = namedtuple(
+    'ActiveCalibration', 'alpha beta gamma delta sigma_i calibration_method last_calibrated'
+)
+_calibration_cache = TTLCache(maxsize=10_000, ttl=300)
+_calibration_cache_lock = threading.Lock()
+_NOT_CACHED = object()
+
+def _linear_calibration(raw: np.ndarray, rh: np.ndarray, temperature: np.ndarray,
+                        alpha: float, beta: float, gamma: float, delta: float) -> np.ndarray:
+    """Compute alpha + beta*c_raw + gamma*rh + delta*t for whole arrays, floored at zero"""
+    # Accumulate in place so a batch allocates the output and one scratch
+    # array rather than a fresh temporary per term
+    corrected = np.multiply(raw, beta)
+    corrected += alpha
+    scratch = np.multiply(rh, gamma)
+    corrected += scratch
+    np.multiply(temperature, delta, out=scratch)
+    corrected += scratch
+    return np.maximum(corrected, 0.0, out=corrected)
+
 class SensorCalibrationService:
     """Service for sensor calibration and validation"""
     
@@ -18,59 +44,58 @@ class SensorCalibrationService:
         self.db = db_session
         self.calibration_window_days = 30  # Default calibration window
         self.min_reference_points = 10     # Minimum points for calibration
+        self.max_calibration_workers = 8   # Stays well inside the default connection pool
+    
+    def with_session(self, db_session: Session) -> 'SensorCalibrationService':
+        """Return a copy bound to another session, sharing the loaded configuration"""
+        bound = copy.copy(self)
+        bound.db = db_session
+        return bound
     
-    def fit_sensor_calibration(self, sensor_id: str, reference_data: List[Dict]) -> Dict:
-        """Fit linear calibration model for a sensor"""
+    def fit_sensor_calibration(self, sensor_id: str,
+                               reference_data: Union[List[Dict], Dict[str, np.ndarray]],
+                               calibrated_at: Optional[datetime] = None) -> Dict:
+        """Fit linear calibration model for a sensor from reference records or columns"""
         try:
-            if len(reference_data) < self.min_reference_points:
-                raise ValueError(f"Insufficient reference data: {len(reference_data)} < {self.min_reference_points}")
-            
-            # Prepare calibration data
-            calibration_df = pd.DataFrame(reference_data)
-            
-            # Validate required columns
-            required_columns = ['raw_pm2_5', 'reference_pm2_5']
-            for col in required_columns:
-                if col not in calibration_df.columns:
-                    raise ValueError(f"Missing required column: {col}")
+            data_points = self._reference_count(reference_data)
+            if data_points < self.min_reference_points:
+                raise ValueError(f"Insufficient reference data: {data_points} < {self.min_reference_points}")
             
-            # Remove rows with missing critical data
-            calibration_df = calibration_df.dropna(subset=required_columns)
+            # Prepare calibration data, removing rows with missing critical data
+            raw, y, rh, temperature = self._reference_columns(reference_data)
             
-            if len(calibration_df) < self.min_reference_points:
-                raise ValueError(f"Insufficient valid data after cleaning: {len(calibration_df)}")
+            if len(y) < self.min_reference_points:
+                raise ValueError(f"Insufficient valid data after cleaning: {len(y)}")
             
-            # Prepare design matrix: [1, raw_pm2_5, rh, temperature]
-            X = self._prepare_design_matrix(calibration_df)
-            y = calibration_df['reference_pm2_5'].values
+            # Prepare design matrix: [1, raw_pm2_5, rh, temperature], minus constant covariates
+            X, features = self._prepare_design_matrix(raw, rh, temperature)
             
             # Fit linear regression
-            model = LinearRegression()
-            model.fit(X, y)
+            intercept, coef, ss_res, ss_tot = self._solve_least_squares(X[:, 1:], y)
+            slopes = dict(zip(features, coef))
             
-            # Calculate performance metrics
-            y_pred = model.predict(X)
-            r2 = r2_score(y, y_pred)
-            rmse = np.sqrt(mean_squared_error(y, y_pred))
-            bias = np.mean(y_pred - y)
+            # Calculate performance metrics; with an intercept the residuals
+            # of the least-squares fit average to exactly zero
+            r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else float(ss_res == 0)
+            rmse = np.sqrt(ss_res / len(y))
+            bias = 0.0
             
             # Calculate residual standard error (sigma_i)
-            residuals = y - y_pred
             degrees_freedom = len(y) - X.shape[1]
-            sigma_i = np.sqrt(np.sum(residuals**2) / degrees_freedom) if degrees_freedom > 0 else rmse
+            sigma_i = np.sqrt(ss_res / degrees_freedom) if degrees_freedom > 0 else rmse
             
             # Extract calibration coefficients
             coefficients = {
-                'alpha': float(model.intercept_),  # Intercept
-                'beta': float(model.coef_[1]),     # Raw PM2.5 coefficient
-                'gamma': float(model.coef_[2]) if X.shape[1] > 2 else 0.0,  # Humidity coefficient
-                'delta': float(model.coef_[3]) if X.shape[1] > 3 else 0.0,  # Temperature coefficient
+                'alpha': float(intercept),  # Intercept
+                'beta': float(slopes['raw_pm2_5']),  # Raw PM2.5 coefficient
+                'gamma': float(slopes.get('rh', 0.0)),  # Humidity coefficient
+                'delta': float(slopes.get('temperature', 0.0)),  # Temperature coefficient
                 'sigma_i': float(sigma_i),
                 'calibration_r2': float(r2),
                 'validation_rmse': float(rmse),
                 'validation_bias': float(bias),
-                'reference_count': len(calibration_df),
-                'last_calibrated': datetime.now(timezone.utc)
+                'reference_count': len(y),
+                'last_calibrated': calibrated_at or datetime.now(timezone.utc)
             }
             
             logger.info(f"Calibration fitted for sensor {sensor_id}: R²={r2:.3f}, RMSE={rmse:.2f}, σᵢ={sigma_i:.2f}")
@@ -81,78 +106,119 @@ class SensorCalibrationService:
             logger.error(f"Calibration fitting failed for sensor {sensor_id}: {e}")
             raise
     
-    def _prepare_design_matrix(self, df: pd.DataFrame) -> np.ndarray:
-        """Prepare design matrix for linear calibration"""
-        # Start with intercept column
-        X = np.ones((len(df), 1))
+    def _solve_least_squares(self, features: np.ndarray, y: np.ndarray) -> Tuple[float, np.ndarray, float, float]:
+        """Solve for intercept and slopes from centred normal equations, with residual and total sums of squares"""
+        # Centre [features | y] together so one product yields both XᵀX and Xᵀy
+        centred = np.column_stack([features, y])
+        means = centred.mean(axis=0)
+        centred -= means
+        gram = centred.T @ centred
         
-        # Add raw PM2.5 column
-        if 'raw_pm2_5' in df.columns:
-            X = np.column_stack([X, df['raw_pm2_5'].values])
-        else:
-            raise ValueError("Missing raw_pm2_5 column")
+        try:
+            coef = np.linalg.solve(gram[:-1, :-1], gram[:-1, -1])
+        except np.linalg.LinAlgError:
+            # A constant column centres to zero and makes the system
+            # singular; min-norm lstsq gives it a zero slope
+            coef = np.linalg.lstsq(centred[:, :-1], centred[:, -1], rcond=None)[0]
         
-        # Add humidity column if available
-        if 'rh' in df.columns and not df['rh'].isna().all():
-            X = np.column_stack([X, df['rh'].fillna(50).values])  # Fill missing with typical value
-        else:
-            X = np.column_stack([X, np.full(len(df), 50)])  # Default humidity
+        # Both sums of squares come from the same Gram matrix, so no
+        # predictions or residual vector are materialized:
+        # SS_tot = yᵀy and SS_res = yᵀy - coefᵀXᵀy on centred data
+        ss_tot = gram[-1, -1]
+        ss_res = max(0.0, ss_tot - coef @ gram[:-1, -1])
         
-        # Add temperature column if available
-        if 'temperature' in df.columns and not df['temperature'].isna().all():
-            X = np.column_stack([X, df['temperature'].fillna(20).values])  # Fill missing with typical value
+        return means[-1] - means[:-1] @ coef, coef, ss_res, ss_tot
+    
+    @staticmethod
+    def _reference_count(reference_data: Union[List[Dict], Dict[str, np.ndarray]]) -> int:
+        """Count reference points in either records or columnar form"""
+        if isinstance(reference_data, dict):
+            return len(reference_data.get('raw_pm2_5', ()))
+        return len(reference_data)
+    
+    def _reference_columns(self, reference_data: Union[List[Dict], Dict[str, np.ndarray]]
+                           ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """Extract raw, reference, rh and temperature arrays, keeping rows with both PM2.5 values"""
+        if isinstance(reference_data, dict):
+            # Columnar input maps straight onto arrays; absent covariates come back as None
+            for col in ('raw_pm2_5', 'reference_pm2_5'):
+                if col not in reference_data:
+                    raise ValueError(f"Missing required column: {col}")
+            raw, reference, rh, temperature = (
+                np.asarray(reference_data[col], dtype=np.float64) if col in reference_data else None
+                for col in ('raw_pm2_5', 'reference_pm2_5', 'rh', 'temperature')
+            )
         else:
-            X = np.column_stack([X, np.full(len(df), 20)])  # Default temperature
+            for col in ('raw_pm2_5', 'reference_pm2_5'):
+                if not any(col in record for record in reference_data):
+                    raise ValueError(f"Missing required column: {col}")
+            
+            # Absent keys and None both become NaN
+            raw, reference, rh, temperature = (
+                np.array([record.get(col) for record in reference_data], dtype=np.float64)
+                for col in ('raw_pm2_5', 'reference_pm2_5', 'rh', 'temperature')
+            )
+        valid = np.isfinite(raw) & np.isfinite(reference)
+        # Boolean indexing copies, so callers may modify the returned arrays in place
+        return tuple(None if values is None else values[valid] for values in (raw, reference, rh, temperature))
+    
+    def _prepare_design_matrix(self, raw: np.ndarray, rh: Optional[np.ndarray],
+                               temperature: Optional[np.ndarray]) -> Tuple[np.ndarray, List[str]]:
+        """Prepare design matrix for linear calibration, returning it with its feature names"""
+        covariates = {'raw_pm2_5': raw}
+        features = ['raw_pm2_5']
+        
+        # Missing humidity and temperature take typical values (50% RH, 20°C), filled
+        # in place. A covariate that is absent, entirely missing or otherwise constant
+        # only duplicates the intercept, so it is left out and the solve shrinks accordingly
+        for name, values, typical in (('rh', rh, 50.0), ('temperature', temperature, 20.0)):
+            if values is None or len(values) == 0 or np.isnan(values).all():
+                continue
+            np.nan_to_num(values, copy=False, nan=typical)
+            if np.ptp(values) > 0:
+                covariates[name] = values
+                features.append(name)
         
-        return X
+        # Allocate [1, features...] once and fill columns in place
+        X = np.empty((len(raw), len(features) + 1), dtype=np.float64)
+        X[:, 0] = 1.0
+        for column, name in enumerate(features, start=1):
+            X[:, column] = covariates[name]
+        
+        return X, features
     
     def apply_calibration(self, sensor_id: str, raw_data: Dict) -> Dict:
         """Apply calibration to raw sensor data"""
         try:
-            # Get calibration parameters
-            calibration = self.db.query(SensorCalibration).filter(
-                SensorCalibration.sensor_id == sensor_id,
-                SensorCalibration.is_active == True
-            ).first()
+            raw_pm25 = raw_data.get('raw_pm2_5')
+            # A single reading gains nothing from float32, so it keeps full precision
+            batch = self.apply_calibration_batch(sensor_id, {
+                'raw_pm2_5': [raw_pm25],
+                'rh': [raw_data.get('rh') or 50],  # Default humidity
+                'temperature': [raw_data.get('temperature') or 20]  # Default temperature
+            }, dtype=np.float64)
             
-            if not calibration:
-                logger.warning(f"No calibration found for sensor {sensor_id}, using default")
+            calibrated_data = raw_data.copy()
+            
+            if batch['calibration_status'] == 'no_calibration':
                 # Use default calibration (no correction)
-                calibrated_data = raw_data.copy()
-                calibrated_data['pm2_5_corrected'] = raw_data.get('raw_pm2_5')
+                calibrated_data['pm2_5_corrected'] = raw_pm25
                 calibrated_data['calibration_applied'] = False
-                calibrated_data['sigma_i'] = 10.0  # Default uncertainty
+                calibrated_data['sigma_i'] = batch['sigma_i']
                 return calibrated_data
             
-            # Apply linear calibration: c_corr = alpha + beta*c_raw + gamma*rh + delta*t
-            raw_pm25 = raw_data.get('raw_pm2_5')
-            rh = raw_data.get('rh', 50)  # Default humidity
-            temperature = raw_data.get('temperature', 20)  # Default temperature
-            
             if raw_pm25 is None:
-                calibrated_data = raw_data.copy()
                 calibrated_data['pm2_5_corrected'] = None
                 calibrated_data['calibration_applied'] = False
                 return calibrated_data
             
-            # Calculate corrected value
-            c_corrected = (
-                float(calibration.alpha) +
-                float(calibration.beta) * float(raw_pm25) +
-                float(calibration.gamma) * float(rh or 50) +
-                float(calibration.delta) * float(temperature or 20)
-            )
-            
-            # Ensure corrected value is non-negative
-            c_corrected = max(0.0, c_corrected)
-            
-            # Prepare calibrated data
-            calibrated_data = raw_data.copy()
-            calibrated_data['pm2_5_corrected'] = round(c_corrected, 2)
+            # Prepare calibrated data; the float64 value is passed on unrounded
+            # (ingestion keeps it as is, the API route rounds for display)
+            calibrated_data['pm2_5_corrected'] = float(batch['pm2_5_corrected'][0])
             calibrated_data['calibration_applied'] = True
-            calibrated_data['sigma_i'] = float(calibration.sigma_i)
-            calibrated_data['calibration_method'] = calibration.calibration_method
-            calibrated_data['last_calibrated'] = calibration.last_calibrated
+            calibrated_data['sigma_i'] = batch['sigma_i']
+            calibrated_data['calibration_method'] = batch['calibration_method']
+            calibrated_data['last_calibrated'] = batch['last_calibrated']
             
             return calibrated_data
             
@@ -165,6 +231,83 @@ class SensorCalibrationService:
             calibrated_data['calibration_error'] = str(e)
             return calibrated_data
     
+    def apply_calibration_batch(self, sensor_id: str, readings: Any,
+                                dtype: type = np.float32) -> Dict[str, Any]:
+        """Apply one sensor's calibration to many readings (DataFrame or dict of arrays)"""
+        raw = np.asarray(readings['raw_pm2_5'], dtype=np.float64)
+        
+        calibration = self._load_calibration(sensor_id)
+        
+        if calibration is None:
+            logger.warning(f"No calibration found for sensor {sensor_id}, using default")
+            return {
+                'pm2_5_corrected': raw,
+                'calibration_applied': np.zeros(raw.shape, dtype=bool),
+                'sigma_i': 10.0,  # Default uncertainty
+                'calibration_method': None,
+                'last_calibrated': None,
+                'calibration_status': 'no_calibration'
+            }
+        
+        def column(name: str, default: float) -> np.ndarray:
+            values = readings[name] if name in readings else None
+            if values is None:
+                return np.full(raw.shape, default, dtype=dtype)
+            values = np.asarray(values, dtype=dtype)
+            return np.where(np.isnan(values), dtype(default), values)
+        
+        # c_corr = alpha + beta*c_raw + gamma*rh + delta*t, clipped at zero;
+        # NaN raw readings stay NaN. Readings carry about three significant
+        # digits, so large batches default to float32 to halve memory traffic
+        corrected = _linear_calibration(
+            raw.astype(dtype, copy=False), column('rh', 50.0), column('temperature', 20.0),
+            calibration.alpha, calibration.beta, calibration.gamma, calibration.delta
+        ).astype(np.float64, copy=False)
+        
+        return {
+            'pm2_5_corrected': corrected,
+            'calibration_applied': ~np.isnan(raw),
+            'sigma_i': calibration.sigma_i,
+            'calibration_method': calibration.calibration_method,
+            'last_calibrated': calibration.last_calibrated,
+            'calibration_status': 'active'
+        }
+    
+    def _load_calibration(self, sensor_id: str) -> Optional[ActiveCalibration]:
+        """Load a sensor's active calibration with its coefficients as floats, cached with a TTL"""
+        with _calibration_cache_lock:
+            cached = _calibration_cache.get(sensor_id, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+        
+        calibration = self.db.query(SensorCalibration).filter(
+            SensorCalibration.sensor_id == sensor_id,
+            SensorCalibration.is_active == True
+        ).first()
+        
+        # Missing calibrations are cached too, so uncalibrated sensors skip the query
+        params = None
+        if calibration:
+            params = ActiveCalibration(
+                alpha=float(calibration.alpha),
+                beta=float(calibration.beta),
+                gamma=float(calibration.gamma),
+                delta=float(calibration.delta),
+                sigma_i=float(calibration.sigma_i),
+                calibration_method=calibration.calibration_method,
+                last_calibrated=calibration.last_calibrated
+            )
+        
+        with _calibration_cache_lock:
+            _calibration_cache[sensor_id] = params
+        return params
+    
+    @staticmethod
+    def _invalidate_calibration(sensor_id: str) -> None:
+        """Drop a sensor's cached calibration after a write"""
+        with _calibration_cache_lock:
+            _calibration_cache.pop(sensor_id, None)
+    
     def store_calibration_parameters(self, sensor_id: str, sensor_type: str, 
                                    calibration_params: Dict) -> bool:
         """Store or update calibration parameters in database"""
@@ -194,6 +337,7 @@ class SensorCalibrationService:
                 logger.info(f"Created new calibration for sensor {sensor_id}")
             
             self.db.commit()
+            self._invalidate_calibration(sensor_id)
             return True
             
         except Exception as e:
@@ -201,6 +345,15 @@ class SensorCalibrationService:
             self.db.rollback()
             return False
     
+    def store_calibration_parameters_bulk(self, calibrations: List[Tuple[str, str, Dict]],
+                                          chunk_size: int = 500) -> bool:
+        """Store or update many sensors' calibrations through the engine's bulk upsert"""
+        stored = CalibrationEngineService(self.db).bulk_store_calibration_parameters(calibrations, chunk_size)
+        if stored:
+            for sensor_id, _, _ in calibrations:
+                self._invalidate_calibration(sensor_id)
+        return stored
+    
     def get_calibration_diagnostics(self, sensor_id: str) -> Dict:
         """Get calibration diagnostics for a sensor"""
         try:
@@ -214,21 +367,26 @@ class SensorCalibrationService:
             # Get recent QC performance
             recent_cutoff = datetime.now(timezone.utc) - timedelta(days=7)
             
-            recent_data = self.db.query(SensorHarmonized).filter(
+            # Calculate recent statistics in the database; no rows reach Python
+            mean_pm25, std_pm25, min_pm25, max_pm25, data_points = self.db.query(
+                func.avg(SensorHarmonized.raw_pm2_5),
+                func.stddev_pop(SensorHarmonized.raw_pm2_5),
+                func.min(SensorHarmonized.raw_pm2_5),
+                func.max(SensorHarmonized.raw_pm2_5),
+                func.count(SensorHarmonized.raw_pm2_5)
+            ).filter(
                 SensorHarmonized.sensor_id == sensor_id,
                 SensorHarmonized.timestamp_utc >= recent_cutoff,
                 SensorHarmonized.raw_pm2_5.isnot(None)
-            ).all()
+            ).one()
             
-            # Calculate recent statistics
-            if recent_data:
-                pm25_values = [float(r.raw_pm2_5) for r in recent_data]
+            if data_points:
                 recent_stats = {
-                    'mean_pm25': np.mean(pm25_values),
-                    'std_pm25': np.std(pm25_values),
-                    'min_pm25': np.min(pm25_values),
-                    'max_pm25': np.max(pm25_values),
-                    'data_points': len(pm25_values)
+                    'mean_pm25': float(mean_pm25),
+                    'std_pm25': float(std_pm25),
+                    'min_pm25': float(min_pm25),
+                    'max_pm25': float(max_pm25),
+                    'data_points': data_points
                 }
             else:
                 recent_stats = {'data_points': 0}
@@ -270,10 +428,15 @@ class SensorCalibrationService:
             if not calibration:
                 return {'error': 'No calibration found'}
             
-            # Get recent sensor data
-            recent_cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+            # Get recent sensor data; one timestamp bounds the whole validation period
+            now = datetime.now(timezone.utc)
+            recent_cutoff = now - timedelta(days=7)
             
-            recent_data = self.db.query(SensorHarmonized).filter(
+            recent_data = self.db.query(
+                SensorHarmonized.raw_pm2_5,
+                SensorHarmonized.rh,
+                SensorHarmonized.temperature
+            ).filter(
                 SensorHarmonized.sensor_id == sensor_id,
                 SensorHarmonized.timestamp_utc >= recent_cutoff,
                 SensorHarmonized.raw_pm2_5.isnot(None)
@@ -282,38 +445,27 @@ class SensorCalibrationService:
             if len(recent_data) < 5:
                 return {'warning': 'Insufficient recent data for validation'}
             
-            # Apply current calibration to recent data
-            validation_results = []
-            for record in recent_data:
-                raw_pm25 = float(record.raw_pm2_5)
-                rh = float(record.rh) if record.rh else 50
-                temp = float(record.temperature) if record.temperature else 20
-                
-                corrected = (
-                    float(calibration.alpha) +
-                    float(calibration.beta) * raw_pm25 +
-                    float(calibration.gamma) * rh +
-                    float(calibration.delta) * temp
-                )
-                
-                validation_results.append({
-                    'timestamp': record.timestamp_utc,
-                    'raw_pm25': raw_pm25,
-                    'corrected_pm25': max(0.0, corrected),
-                    'rh': rh,
-                    'temperature': temp
-                })
+            # Apply current calibration to recent data in one vectorized pass;
+            # NULL columns arrive as NaN, and missing (or zero) humidity and
+            # temperature take typical values
+            readings = np.array(recent_data, dtype=np.float64)
+            raw_values, rh, temperature = readings[:, 0], readings[:, 1], readings[:, 2]
+            
+            corrected_values = _linear_calibration(
+                raw_values,
+                np.where(np.isnan(rh) | (rh == 0), 50.0, rh),
+                np.where(np.isnan(temperature) | (temperature == 0), 20.0, temperature),
+                float(calibration.alpha), float(calibration.beta),
+                float(calibration.gamma), float(calibration.delta)
+            )
             
             # Calculate validation statistics
-            corrected_values = [r['corrected_pm25'] for r in validation_results]
-            raw_values = [r['raw_pm25'] for r in validation_results]
-            
             stats = {
                 'sensor_id': sensor_id,
                 'validation_period': {
                     'start': recent_cutoff.isoformat(),
-                    'end': datetime.now(timezone.utc).isoformat(),
-                    'data_points': len(validation_results)
+                    'end': now.isoformat(),
+                    'data_points': len(raw_values)
                 },
                 'correction_stats': {
                     'mean_raw': float(np.mean(raw_values)),
@@ -341,8 +493,9 @@ class SensorCalibrationService:
     def auto_calibrate_sensors(self, source_filter: Optional[str] = None) -> Dict:
         """Automatically calibrate sensors that need recalibration"""
         try:
-            # Find sensors that need recalibration
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.calibration_window_days)
+            # Find sensors that need recalibration; one timestamp serves the whole run
+            now = datetime.now(timezone.utc)
+            cutoff_date = now - timedelta(days=self.calibration_window_days)
             
             query = self.db.query(SensorCalibration).filter(
                 (SensorCalibration.last_calibrated < cutoff_date) |
@@ -350,12 +503,11 @@ class SensorCalibrationService:
             )
             
             if source_filter:
-                # Get sensors from specific source
-                sensor_ids = self.db.query(SensorHarmonized.sensor_id).filter(
+                # Restrict to sensors from a specific source with a join on the database side
+                source_sensors = self.db.query(SensorHarmonized.sensor_id).filter(
                     SensorHarmonized.source == source_filter
-                ).distinct().all()
-                sensor_id_list = [sid[0] for sid in sensor_ids]
-                query = query.filter(SensorCalibration.sensor_id.in_(sensor_id_list))
+                ).distinct().subquery()
+                query = query.join(source_sensors, SensorCalibration.sensor_id == source_sensors.c.sensor_id)
             
             sensors_to_calibrate = query.all()
             
@@ -366,38 +518,40 @@ class SensorCalibrationService:
                 'results': []
             }
             
-            for sensor_calibration in sensors_to_calibrate:
+            # Sensors are independent, so their reference reads and fits run
+            # concurrently; workers only return parameters and the main
+            # session stores everything once they have all finished
+            calibrations, pending_results = [], []
+            workers = max(1, min(self.max_calibration_workers, len(sensors_to_calibrate)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (sensor_calibration, executor.submit(self._calibrate_sensor, sensor_calibration.sensor_id, now))
+                    for sensor_calibration in sensors_to_calibrate
+                ]
+            
+            # Results are collected in submission order, so the report is stable
+            for sensor_calibration, future in futures:
                 try:
-                    # Get reference data for this sensor (mock for now - would come from co-location studies)
-                    reference_data = self._generate_mock_reference_data(sensor_calibration.sensor_id)
+                    data_points, new_params = future.result()
                     
-                    if len(reference_data) >= self.min_reference_points:
-                        # Fit new calibration
-                        new_params = self.fit_sensor_calibration(sensor_calibration.sensor_id, reference_data)
-                        
-                        # Update calibration parameters
-                        success = self.store_calibration_parameters(
+                    if new_params is not None:
+                        calibrations.append((
                             sensor_calibration.sensor_id,
                             sensor_calibration.sensor_type,
                             new_params
-                        )
-                        
-                        if success:
-                            calibration_results['successful_calibrations'] += 1
-                            calibration_results['results'].append({
-                                'sensor_id': sensor_calibration.sensor_id,
-                                'status': 'success',
-                                'r2': new_params.get('calibration_r2'),
-                                'rmse': new_params.get('validation_rmse'),
-                                'sigma_i': new_params.get('sigma_i')
-                            })
-                        else:
-                            calibration_results['failed_calibrations'] += 1
+                        ))
+                        pending_results.append({
+                            'sensor_id': sensor_calibration.sensor_id,
+                            'status': 'success',
+                            'r2': new_params.get('calibration_r2'),
+                            'rmse': new_params.get('validation_rmse'),
+                            'sigma_i': new_params.get('sigma_i')
+                        })
                     else:
                         calibration_results['results'].append({
                             'sensor_id': sensor_calibration.sensor_id,
                             'status': 'insufficient_data',
-                            'data_points': len(reference_data)
+                            'data_points': data_points
                         })
                         
                 except Exception as e:
@@ -411,6 +565,13 @@ class SensorCalibrationService:
                 
                 calibration_results['sensors_processed'] += 1
             
+            # Update calibration parameters in one transaction
+            if self.store_calibration_parameters_bulk(calibrations):
+                calibration_results['successful_calibrations'] += len(pending_results)
+                calibration_results['results'].extend(pending_results)
+            else:
+                calibration_results['failed_calibrations'] += len(pending_results)
+            
             logger.info(f"Auto-calibration completed: {calibration_results['successful_calibrations']}/{calibration_results['sensors_processed']} successful")
             
             return calibration_results
@@ -419,66 +580,58 @@ class SensorCalibrationService:
             logger.error(f"Auto-calibration process failed: {e}")
             return {'error': str(e)}
     
-    def _generate_mock_reference_data(self, sensor_id: str) -> List[Dict]:
-        """Generate mock reference data for calibration (replace with real co-location data)"""
+    def _calibrate_sensor(self, sensor_id: str, calibrated_at: datetime) -> Tuple[int, Optional[Dict]]:
+        """Fit one sensor on a worker-owned session, returning its data count and parameters"""
+        # Sessions are not thread-safe, so each worker reads through its own
+        with Session(bind=self.db.get_bind()) as session:
+            # Get reference data for this sensor (mock for now - would come from co-location studies)
+            reference_data = self.with_session(session)._generate_mock_reference_data(sensor_id)
+        
+        data_points = self._reference_count(reference_data)
+        if data_points < self.min_reference_points:
+            return data_points, None
+        return data_points, self.fit_sensor_calibration(sensor_id, reference_data, calibrated_at)
+    
+    def _generate_mock_reference_data(self, sensor_id: str) -> Dict[str, np.ndarray]:
+        """Generate mock reference data columns for calibration (replace with real co-location data)"""
         # In production, this would fetch co-location data from reference monitors
         # For now, generate synthetic but realistic reference data
         
         recent_cutoff = datetime.now(timezone.utc) - timedelta(days=30)
         
         # Get recent sensor data
-        sensor_data = self.db.query(SensorHarmonized).filter(
+        sensor_data = self.db.query(
+            SensorHarmonized.timestamp_utc,
+            SensorHarmonized.raw_pm2_5,
+            SensorHarmonized.rh,
+            SensorHarmonized.temperature
+        ).filter(
             SensorHarmonized.sensor_id == sensor_id,
             SensorHarmonized.timestamp_utc >= recent_cutoff,
             SensorHarmonized.raw_pm2_5.isnot(None)
         ).limit(50).all()
         
-        reference_data = []
-        for record in sensor_data:
-            raw_pm25 = float(record.raw_pm2_5)
-            
-            # Simulate reference measurement with realistic bias and noise
-            # Typical low-cost sensor bias patterns
-            reference_pm25 = raw_pm25 * 0.85 + 2.0 + np.random.normal(0, 3.0)
-            reference_pm25 = max(0, reference_pm25)  # Ensure non-negative
-            
-            reference_data.append({
-                'timestamp': record.timestamp_utc,
-                'raw_pm2_5': raw_pm25,
-                'reference_pm2_5': reference_pm25,
-                'rh': float(record.rh) if record.rh else 50,
-                'temperature': float(record.temperature) if record.temperature else 20
-            })
+        if not sensor_data:
+            return {column: np.empty(0) for column in ('timestamp', 'raw_pm2_5', 'reference_pm2_5', 'rh', 'temperature')}
         
-        return reference_data
-    
-    def store_calibration_parameters(self, sensor_id: str, sensor_type: str, 
-                                   calibration_params: Dict) -> bool:
-        """Store calibration parameters (reusing from quality_control_service.py)"""
-        try:
-            existing_calibration = self.db.query(SensorCalibration).filter(
-                SensorCalibration.sensor_id == sensor_id
-            ).first()
-            
-            if existing_calibration:
-                # Update existing
-                for key, value in calibration_params.items():
-                    if hasattr(existing_calibration, key):
-                        setattr(existing_calibration, key, value)
-                existing_calibration.updated_at = datetime.now(timezone.utc)
-            else:
-                # Create new
-                new_calibration = SensorCalibration(
-                    sensor_id=sensor_id,
-                    sensor_type=sensor_type,
-                    **calibration_params
-                )
-                self.db.add(new_calibration)
-            
-            self.db.commit()
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to store calibration for {sensor_id}: {e}")
-            self.db.rollback()
-            return False
+        timestamps, raw_pm25, rh, temperature = zip(*sensor_data)
+        raw_pm25 = np.array(raw_pm25, dtype=np.float64)
+        rh = np.array(rh, dtype=np.float64)
+        temperature = np.array(temperature, dtype=np.float64)
+        
+        # Simulate reference measurements with realistic bias and noise in one draw
+        # Typical low-cost sensor bias patterns
+        rng = np.random.default_rng()
+        reference_pm25 = np.maximum(0.0, raw_pm25 * 0.85 + 2.0 + rng.normal(0.0, 3.0, raw_pm25.size))
+        
+        # Missing (or zero) humidity and temperature take typical values
+        rh = np.where(np.isnan(rh) | (rh == 0), 50.0, rh)
+        temperature = np.where(np.isnan(temperature) | (temperature == 0), 20.0, temperature)
+        
+        return {
+            'timestamp': np.array(timestamps, dtype=object),
+            'raw_pm2_5': raw_pm25,
+            'reference_pm2_5': reference_pm25,
+            'rh': rh,
+            'temperature': temperature
+        }
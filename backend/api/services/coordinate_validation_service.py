@@ -1,15 +1,110 @@
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+from collections import Counter
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
+from functools import lru_cache
 import math
+import re
 import numpy as np
+from shapely import STRtree, points
+from shapely.geometry import Point, Polygon, box
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371
+_DEG_TO_RAD = math.pi / 180
+
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers between two coordinates"""
+    # Plain float arithmetic with degree conversion folded into one multiply per angle
+    sin_half_lat = math.sin((lat2 - lat1) * _DEG_TO_RAD / 2)
+    sin_half_lon = math.sin((lon2 - lon1) * _DEG_TO_RAD / 2)
+    a = (sin_half_lat * sin_half_lat +
+         math.cos(lat1 * _DEG_TO_RAD) * math.cos(lat2 * _DEG_TO_RAD) * (sin_half_lon * sin_half_lon))
+    return EARTH_RADIUS_KM * (2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
+
+def _running_stats(values: Iterable[float]) -> Tuple[int, float, float, float, float]:
+    """Count, mean, sum of squared deviations, min and max in one pass (Welford)"""
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    lo = math.inf
+    hi = -math.inf
+    for value in values:
+        n += 1
+        delta = value - mean
+        mean += delta / n
+        m2 += delta * (value - mean)
+        if value < lo:
+            lo = value
+        if value > hi:
+            hi = value
+    return n, mean, m2, lo, hi
+
+def _median_from_counts(counts: Counter) -> float:
+    """Median of values given as value counts, averaging the middle pair for even sizes"""
+    n = sum(counts.values())
+    lower_rank, upper_rank = (n - 1) // 2, n // 2
+    seen = 0
+    lower = None
+    for value in sorted(counts):
+        seen += counts[value]
+        if lower is None and seen > lower_rank:
+            lower = value
+        if seen > upper_rank:
+            return (lower + value) / 2
+    return math.nan
+
+def _haversine_vec(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Element-wise great-circle distances in kilometers between coordinate arrays"""
+    sin_half_lat = np.sin(np.radians(lat2 - lat1) / 2)
+    sin_half_lon = np.sin(np.radians(lon2 - lon1) / 2)
+    a = sin_half_lat * sin_half_lat
+    a += np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * (sin_half_lon * sin_half_lon)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+@dataclass(slots=True)
+class ValidationResult:
+    """Outcome of validating one coordinate pair
+    
+    Validation steps write into the fields in place; ``to_dict`` gives the
+    plain mapping attached to records and returned by the batch helpers.
+    """
+    is_valid: bool
+    latitude: float
+    longitude: float
+    normalized_lat: Optional[float] = None
+    normalized_lon: Optional[float] = None
+    validation_flags: List[str] = field(default_factory=list)
+    confidence_score: float = 1.0
+    metadata: Dict = field(default_factory=dict)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
 class CoordinateValidationService:
     """Service for comprehensive coordinate validation and normalization"""
     
-    def __init__(self):
+    # Country/administrative reference points that often appear as default values
+    ADMINISTRATIVE_BOUNDARIES = [
+        (37.0902, -95.7129),  # Geographic center of US
+        (51.5074, -0.1278),   # London (common default)
+        (40.7128, -74.0060),  # NYC (common default)
+        (0.0, 0.0)            # Origin point
+    ]
+    
+    # Squared flat-earth screening radius in degrees for the administrative-point check:
+    # twice the 0.01 km match distance (1° ≈ 111.19 km), so the screen never drops a match
+    NEAR_BOUNDARY_SCREEN_SQ_DEG = (2 * 0.01 / 111.19) ** 2
+    
+    # Indicators of marine/water deployment, matched anywhere in the metadata text
+    MARINE_PATTERN = re.compile(r'marine|ocean|ship|buoy|boat|vessel|water')
+    
+    # The only metadata fields validation reads
+    METADATA_FIELDS = ('sensor_type', 'location_type', 'description')
+    
+    def __init__(self, land_polygons: Optional[List[Polygon]] = None):
         # Validation thresholds and ranges
         self.validation_config = {
             'latitude_range': (-90.0, 90.0),
@@ -31,6 +126,12 @@ class CoordinateValidationService:
             ]
         }
         
+        # Configuration read on every validation, hoisted out of the nested config dict
+        self._lat_min, self._lat_max = self.validation_config['latitude_range']
+        self._lon_min, self._lon_max = self.validation_config['longitude_range']
+        self._precision = self.validation_config['precision_decimal_places']
+        self._suspicious_patterns = self.validation_config['suspicious_coordinate_patterns']
+        
         # Land/water validation (simplified - in production use detailed coastline data)
         self.known_land_areas = [
             # Major continental areas for validation
@@ -41,108 +142,108 @@ class CoordinateValidationService:
             {'bounds': [-85, -25, -35, 15], 'name': 'South America'},
             {'bounds': [10, -35, 50, 35], 'name': 'Africa'}
         ]
+        
+        # Spatial indexes for point-in-area lookups, built once; the bounds are also
+        # kept as (K, 4) arrays of [min_lon, min_lat, max_lon, max_lat] for batch masks
+        ocean_boxes = [zone['bounds'] for zone in self.validation_config['ocean_exclusion_zones']] + [
+            [-180, -60, -120, 60],  # Pacific Ocean
+            [-40, -40, -20, 60]     # Atlantic Ocean (mid-ocean)
+        ]
+        self._ocean_bounds = np.array(ocean_boxes, dtype=np.float64)
+        self._ocean_index = STRtree([box(*bounds) for bounds in ocean_boxes])
+        
+        # Detailed land polygons (e.g. from coastline data) replace the land boxes when given
+        self.land_polygons = land_polygons
+        self._land_bounds = np.array([area['bounds'] for area in self.known_land_areas], dtype=np.float64)
+        self._land_index = STRtree(
+            land_polygons if land_polygons is not None
+            else [box(*area['bounds']) for area in self.known_land_areas]
+        )
+        
+        self._administrative_points = np.array(self.ADMINISTRATIVE_BOUNDARIES, dtype=np.float64)
+        
+        # Memoized validation for repeated coordinates (same station, defaulted positions)
+        self._validate_coordinates_cached = lru_cache(maxsize=65536)(self._validate_coordinates_for_key)
     
     def validate_coordinates(self, latitude: float, longitude: float, 
-                           sensor_metadata: Optional[Dict] = None) -> Dict[str, Any]:
+                           sensor_metadata: Optional[Dict] = None) -> ValidationResult:
         """Comprehensive coordinate validation with detailed feedback"""
-        validation_result = {
-            'is_valid': True,
-            'latitude': latitude,
-            'longitude': longitude,
-            'normalized_lat': None,
-            'normalized_lon': None,
-            'validation_flags': [],
-            'confidence_score': 1.0,
-            'metadata': sensor_metadata or {}
-        }
+        try:
+            metadata_key = (tuple(sensor_metadata.get(field, '') for field in self.METADATA_FIELDS)
+                            if sensor_metadata else None)
+            cached = self._validate_coordinates_cached(latitude, longitude, metadata_key)
+        except (AttributeError, TypeError):
+            # Metadata that isn't a dict, or unhashable values, bypass the cache
+            return self._validate_coordinates_uncached(latitude, longitude, sensor_metadata)
+        
+        # Callers annotate and extend results, so each gets its own copy
+        return replace(cached, latitude=latitude, longitude=longitude,
+                       validation_flags=list(cached.validation_flags), metadata=sensor_metadata or {})
+    
+    def _validate_coordinates_for_key(self, latitude: float, longitude: float,
+                                      metadata_key: Optional[Tuple]) -> ValidationResult:
+        """Validate coordinates with metadata rebuilt from its cache key"""
+        metadata = dict(zip(self.METADATA_FIELDS, metadata_key)) if metadata_key is not None else None
+        return self._validate_coordinates_uncached(latitude, longitude, metadata)
+    
+    def _validate_coordinates_uncached(self, latitude: float, longitude: float,
+                                       sensor_metadata: Optional[Dict] = None) -> ValidationResult:
+        """Run every validation step for a coordinate pair"""
+        validation_result = ValidationResult(True, latitude, longitude, metadata=sensor_metadata or {})
         
         try:
-            # Step 1: Basic range validation
-            range_validation = self._validate_coordinate_ranges(latitude, longitude)
-            if not range_validation['valid']:
-                validation_result['is_valid'] = False
-                validation_result['validation_flags'].extend(range_validation['flags'])
-                return validation_result
-            
-            # Step 2: Precision and format validation
-            precision_validation = self._validate_coordinate_precision(latitude, longitude)
-            validation_result['validation_flags'].extend(precision_validation['flags'])
-            validation_result['confidence_score'] *= precision_validation['confidence_factor']
-            
-            # Step 3: Suspicious pattern detection
-            pattern_validation = self._detect_suspicious_patterns(latitude, longitude)
-            validation_result['validation_flags'].extend(pattern_validation['flags'])
-            validation_result['confidence_score'] *= pattern_validation['confidence_factor']
-            
-            # Step 4: Land/water validation for sensors
-            location_validation = self._validate_sensor_location(latitude, longitude, sensor_metadata)
-            validation_result['validation_flags'].extend(location_validation['flags'])
-            validation_result['confidence_score'] *= location_validation['confidence_factor']
-            
-            # Step 5: Normalize coordinates
-            validation_result['normalized_lat'] = self._normalize_latitude(latitude)
-            validation_result['normalized_lon'] = self._normalize_longitude(longitude)
-            
-            # Step 6: Calculate final validity
-            critical_flags = [flag for flag in validation_result['validation_flags'] 
-                            if flag.startswith('CRITICAL_')]
-            if critical_flags or validation_result['confidence_score'] < 0.3:
-                validation_result['is_valid'] = False
+            self._validate_coordinates_fused(latitude, longitude, sensor_metadata, validation_result)
             
             logger.debug(f"Coordinate validation: ({latitude}, {longitude}) -> "
-                        f"Valid: {validation_result['is_valid']}, "
-                        f"Confidence: {validation_result['confidence_score']:.2f}")
+                        f"Valid: {validation_result.is_valid}, "
+                        f"Confidence: {validation_result.confidence_score:.2f}")
             
             return validation_result
             
         except Exception as e:
             logger.error(f"Coordinate validation failed: {e}")
-            validation_result['is_valid'] = False
-            validation_result['validation_flags'].append('CRITICAL_VALIDATION_ERROR')
+            validation_result.is_valid = False
+            validation_result.validation_flags.append('CRITICAL_VALIDATION_ERROR')
             return validation_result
     
-    def _validate_coordinate_ranges(self, lat: float, lon: float) -> Dict:
-        """Validate coordinates are within valid Earth ranges"""
-        flags = []
-        valid = True
+    def _validate_coordinates_fused(self, lat: float, lon: float, metadata: Optional[Dict],
+                                    out: ValidationResult) -> None:
+        """Run every validation step, writing flags and confidence straight into the result"""
+        flags = out.validation_flags
         
-        # Latitude validation
+        # Step 1: Basic range validation
+        in_range = True
         if not isinstance(lat, (int, float)) or math.isnan(lat) or math.isinf(lat):
             flags.append('CRITICAL_INVALID_LATITUDE_FORMAT')
-            valid = False
-        elif not (self.validation_config['latitude_range'][0] <= lat <= self.validation_config['latitude_range'][1]):
+            in_range = False
+        elif not (self._lat_min <= lat <= self._lat_max):
             flags.append('CRITICAL_LATITUDE_OUT_OF_RANGE')
-            valid = False
+            in_range = False
         
-        # Longitude validation
         if not isinstance(lon, (int, float)) or math.isnan(lon) or math.isinf(lon):
             flags.append('CRITICAL_INVALID_LONGITUDE_FORMAT')
-            valid = False
-        elif not (self.validation_config['longitude_range'][0] <= lon <= self.validation_config['longitude_range'][1]):
+            in_range = False
+        elif not (self._lon_min <= lon <= self._lon_max):
             flags.append('CRITICAL_LONGITUDE_OUT_OF_RANGE')
-            valid = False
-        
-        return {'valid': valid, 'flags': flags}
-    
-    def _validate_coordinate_precision(self, lat: float, lon: float) -> Dict:
-        """Validate coordinate precision and detect truncation"""
-        flags = []
-        confidence_factor = 1.0
+            in_range = False
         
-        # Check decimal precision
-        lat_str = str(lat)
-        lon_str = str(lon)
+        if not in_range:
+            out.is_valid = False
+            return
         
-        lat_decimal_places = len(lat_str.split('.')[-1]) if '.' in lat_str else 0
-        lon_decimal_places = len(lon_str.split('.')[-1]) if '.' in lon_str else 0
+        # Step 2: Precision and format validation. Each step multiplies its factors
+        # together before applying them, so scores match step-by-step evaluation
+        lat_decimal_places = self._decimal_places(lat)
+        lon_decimal_places = self._decimal_places(lon)
+        confidence_factor = 1.0
         
         # Flag low precision coordinates
         if lat_decimal_places < 4 or lon_decimal_places < 4:
             flags.append('LOW_PRECISION_COORDINATES')
             confidence_factor *= 0.8
         
-        # Flag suspiciously rounded coordinates
-        if lat % 0.001 == 0 and lon % 0.001 == 0:
+        # Flag suspiciously rounded coordinates (both on a 0.001° grid)
+        if lat_decimal_places <= 3 and lon_decimal_places <= 3:
             flags.append('SUSPICIOUSLY_ROUNDED_COORDINATES')
             confidence_factor *= 0.7
         
@@ -151,147 +252,150 @@ class CoordinateValidationService:
             flags.append('IDENTICAL_LAT_LON_VALUES')
             confidence_factor *= 0.5
         
-        return {'flags': flags, 'confidence_factor': confidence_factor}
-    
-    def _detect_suspicious_patterns(self, lat: float, lon: float) -> Dict:
-        """Detect suspicious coordinate patterns"""
-        flags = []
+        out.confidence_score *= confidence_factor
+        
+        # Step 3: Suspicious pattern detection
         confidence_factor = 1.0
         
         # Check for exact suspicious coordinate pairs
-        for suspicious_lat, suspicious_lon in self.validation_config['suspicious_coordinate_patterns']:
+        for suspicious_lat, suspicious_lon in self._suspicious_patterns:
             if abs(lat - suspicious_lat) < 0.0001 and abs(lon - suspicious_lon) < 0.0001:
                 flags.append(f'SUSPICIOUS_LOCATION_{suspicious_lat}_{suspicious_lon}')
                 confidence_factor *= 0.2
         
-        # Check for coordinates at country/administrative boundaries (often default values)
-        administrative_boundaries = [
-            (37.0902, -95.7129),  # Geographic center of US
-            (51.5074, -0.1278),   # London (common default)
-            (40.7128, -74.0060),  # NYC (common default)
-            (0.0, 0.0)            # Origin point
-        ]
-        
-        for boundary_lat, boundary_lon in administrative_boundaries:
+        # Check for coordinates at country/administrative boundaries (often default values).
+        # A flat-earth squared distance screens out far points without trigonometry;
+        # only near candidates get the exact Haversine distance
+        cos_lat = math.cos(math.radians(lat))
+        for boundary_lat, boundary_lon in self.ADMINISTRATIVE_BOUNDARIES:
+            delta_lat = lat - boundary_lat
+            delta_lon = ((lon - boundary_lon + 180) % 360 - 180) * cos_lat
+            if delta_lat * delta_lat + delta_lon * delta_lon >= self.NEAR_BOUNDARY_SCREEN_SQ_DEG:
+                continue
             distance = self._calculate_distance(lat, lon, boundary_lat, boundary_lon)
             if distance < 0.01:  # Within ~1km
                 flags.append('NEAR_ADMINISTRATIVE_BOUNDARY')
                 confidence_factor *= 0.8
         
-        return {'flags': flags, 'confidence_factor': confidence_factor}
-    
-    def _validate_sensor_location(self, lat: float, lon: float, metadata: Optional[Dict]) -> Dict:
-        """Validate sensor location against expected deployment areas"""
-        flags = []
-        confidence_factor = 1.0
-        
-        # Check if coordinates are in major ocean areas (unlikely for land-based sensors)
-        is_likely_ocean = self._is_likely_ocean_location(lat, lon)
-        if is_likely_ocean and not self._is_marine_sensor(metadata):
-            flags.append('POTENTIAL_OCEAN_LOCATION')
-            confidence_factor *= 0.3
+        out.confidence_score *= confidence_factor
         
-        # Check if coordinates are on known land areas
-        is_on_land = self._is_on_known_land(lat, lon)
-        if not is_on_land:
-            flags.append('UNCERTAIN_LAND_LOCATION')
-            confidence_factor *= 0.6
+        # Step 4: Land/water validation for sensors
+        out.confidence_score *= self._check_sensor_location(
+            self._is_likely_ocean_location(lat, lon),
+            self._is_on_known_land(lat, lon),
+            lat_decimal_places > 6 or lon_decimal_places > 6,
+            metadata,
+            flags
+        )
         
-        # Validate against sensor type expectations
-        if metadata:
-            sensor_type = metadata.get('sensor_type', '').lower()
-            location_type = metadata.get('location_type', '').lower()
-            
-            # Indoor sensors with precise coordinates are more suspicious
-            if 'indoor' in location_type and self._has_high_precision(lat, lon):
-                flags.append('INDOOR_HIGH_PRECISION')
-                confidence_factor *= 0.9
-            
-            # Mobile sensors should have more variable coordinates
-            if 'mobile' in sensor_type and self._appears_stationary(lat, lon, metadata):
-                flags.append('MOBILE_SENSOR_STATIONARY')
-                confidence_factor *= 0.7
+        # Step 5: Normalize coordinates
+        out.normalized_lat = self._normalize_latitude(lat)
+        out.normalized_lon = self._normalize_longitude(lon)
         
-        return {'flags': flags, 'confidence_factor': confidence_factor}
+        # Step 6: Calculate final validity
+        if out.confidence_score < 0.3 or any(flag.startswith('CRITICAL_') for flag in flags):
+            out.is_valid = False
     
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two coordinates using Haversine formula"""
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat / 2) ** 2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        return R * c
+        return _haversine(lat1, lon1, lat2, lon2)
+    
+    def _calculate_distances(self, lats: np.ndarray, lons: np.ndarray,
+                             lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+        """Calculate element-wise Haversine distances between coordinate arrays"""
+        return _haversine_vec(lats, lons, lat2, lon2)
     
     def _is_likely_ocean_location(self, lat: float, lon: float) -> bool:
         """Check if coordinates are likely in ocean areas"""
         # Simple ocean detection - in production use detailed coastline data
-        for ocean_zone in self.validation_config['ocean_exclusion_zones']:
-            bounds = ocean_zone['bounds']
-            if (bounds[0] <= lon <= bounds[2] and bounds[1] <= lat <= bounds[3]):
-                return True
-        
-        # Additional ocean checks
-        # Pacific Ocean
-        if -180 <= lon <= -120 and -60 <= lat <= 60:
-            return True
-        # Atlantic Ocean (mid-ocean)
-        if -40 <= lon <= -20 and -40 <= lat <= 60:
-            return True
-        
-        return False
+        return len(self._ocean_index.query(Point(lon, lat), predicate='intersects')) > 0
     
     def _is_on_known_land(self, lat: float, lon: float) -> bool:
         """Check if coordinates are on known land areas"""
-        for land_area in self.known_land_areas:
-            bounds = land_area['bounds']
-            if (bounds[0] <= lon <= bounds[2] and bounds[1] <= lat <= bounds[3]):
-                return True
-        return False
+        return len(self._land_index.query(Point(lon, lat), predicate='intersects')) > 0
+    
+    def _bounds_mask(self, bounds: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Mark coordinates falling inside any of the given bounding boxes"""
+        # Broadcast (N, 1) coordinates against the (K,) box edges: one (N, K) test for all zones
+        lats = lats[:, np.newaxis]
+        lons = lons[:, np.newaxis]
+        return ((lons >= bounds[:, 0]) & (lons <= bounds[:, 2]) &
+                (lats >= bounds[:, 1]) & (lats <= bounds[:, 3])).any(axis=1)
+    
+    def _is_likely_ocean_batch(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Check which coordinates of a batch are likely in ocean areas"""
+        return self._bounds_mask(self._ocean_bounds, lats, lons)
+    
+    def _is_on_known_land_batch(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Mark coordinates on known land areas for a batch"""
+        if self.land_polygons is None:
+            return self._bounds_mask(self._land_bounds, lats, lons)
+        
+        # Polygon containment goes through the spatial index in one bulk query
+        mask = np.zeros(len(lats), dtype=bool)
+        mask[self._land_index.query(points(lons, lats), predicate='intersects')[0]] = True
+        return mask
     
     def _is_marine_sensor(self, metadata: Optional[Dict]) -> bool:
         """Check if sensor is intended for marine/water deployment"""
         if not metadata:
             return False
         
-        marine_indicators = ['marine', 'ocean', 'ship', 'buoy', 'boat', 'vessel', 'water']
-        sensor_type = metadata.get('sensor_type', '').lower()
-        location_type = metadata.get('location_type', '').lower()
-        description = metadata.get('description', '').lower()
-        
-        return any(indicator in text for indicator in marine_indicators 
-                  for text in [sensor_type, location_type, description])
+        # One regex scan over the combined text; no indicator contains the separator,
+        # so a match can never straddle two fields
+        text = ' '.join((
+            metadata.get('sensor_type', '').lower(),
+            metadata.get('location_type', '').lower(),
+            metadata.get('description', '').lower()
+        ))
+        return self.MARINE_PATTERN.search(text) is not None
     
-    def _has_high_precision(self, lat: float, lon: float) -> bool:
-        """Check if coordinates have unusually high precision"""
-        lat_precision = len(str(lat).split('.')[-1]) if '.' in str(lat) else 0
-        lon_precision = len(str(lon).split('.')[-1]) if '.' in str(lon) else 0
-        
-        return lat_precision > 6 or lon_precision > 6
+    @staticmethod
+    def _decimal_places(value: float) -> int:
+        """Count a coordinate's decimal places, reporting eight for anything beyond seven"""
+        # Scale to an integer count of 1e-7 degree steps; float error stays well below
+        # the 1e-5 tolerance across the coordinate range, a genuine eighth digit does not
+        scaled = abs(value) * 1e7
+        digits = round(scaled)
+        if abs(scaled - digits) > 1e-5:
+            return 8
+        
+        # Each trailing decimal zero of the step count is one fewer decimal place
+        places = 7
+        while places and digits % 10 == 0:
+            digits //= 10
+            places -= 1
+        return places
     
-    def _appears_stationary(self, lat: float, lon: float, metadata: Dict) -> bool:
-        """Check if mobile sensor appears to be stationary"""
-        # In production, this would check historical positions
-        # For now, flag if coordinates are too precise for mobile sensor
-        return self._has_high_precision(lat, lon)
+    @staticmethod
+    def _decimal_places_array(values: np.ndarray) -> np.ndarray:
+        """Count decimal places for an array of coordinates, as in _decimal_places"""
+        scaled = np.abs(values) * 1e7
+        digits = np.round(scaled)
+        places = np.full(len(values), 7, dtype=np.int64)
+        for step in (10.0, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7):
+            places -= np.fmod(digits, step) == 0
+        places[np.abs(scaled - digits) > 1e-5] = 8
+        return places
     
     def _normalize_latitude(self, lat: float) -> float:
         """Normalize latitude to standard precision"""
+        # Fast path: nearly every latitude is already in range
+        if self._lat_min <= lat <= self._lat_max:
+            return round(lat, self._precision)
+        
         # Clamp to valid range
-        normalized = max(self.validation_config['latitude_range'][0], 
-                        min(self.validation_config['latitude_range'][1], lat))
+        normalized = max(self._lat_min, min(self._lat_max, lat))
         
         # Round to specified precision
-        return round(normalized, self.validation_config['precision_decimal_places'])
+        return round(normalized, self._precision)
     
     def _normalize_longitude(self, lon: float) -> float:
         """Normalize longitude to standard precision and handle wrapping"""
+        # Fast path: nearly every longitude is already in range and needs no wrapping
+        if self._lon_min <= lon <= self._lon_max:
+            return round(lon, self._precision)
+        
         # Handle longitude wrapping (e.g., 185° -> -175°)
         if lon > 180:
             lon = lon - 360
@@ -299,53 +403,147 @@ class CoordinateValidationService:
             lon = lon + 360
         
         # Clamp to valid range
-        normalized = max(self.validation_config['longitude_range'][0], 
-                        min(self.validation_config['longitude_range'][1], lon))
+        normalized = max(self._lon_min, min(self._lon_max, lon))
         
         # Round to specified precision
-        return round(normalized, self.validation_config['precision_decimal_places'])
+        return round(normalized, self._precision)
     
     def batch_validate_coordinates(self, sensors: List[Dict]) -> Dict[str, Any]:
-        """Validate coordinates for a batch of sensors"""
+        """Validate coordinates for a batch of sensors with whole-array checks"""
         validation_summary = {
             'total_sensors': len(sensors),
             'valid_sensors': 0,
             'invalid_sensors': 0,
             'suspicious_sensors': 0,
             'validation_results': [],
-            'flag_summary': {},
+            'flag_summary': Counter(),
             'processing_time': datetime.now(timezone.utc)
         }
         
         start_time = datetime.now(timezone.utc)
         
+        # Struct-of-arrays layout: one contiguous array per coordinate
+        lats, lons, parsed = self._extract_coordinate_arrays(sensors)
+        flags = [[] for _ in sensors]
+        
+        # Step 1: Range and format checks for every sensor at once
+        lat_bad_format = ~np.isfinite(lats)
+        lon_bad_format = ~np.isfinite(lons)
+        range_masks = [
+            ('CRITICAL_INVALID_LATITUDE_FORMAT', lat_bad_format),
+            ('CRITICAL_LATITUDE_OUT_OF_RANGE', ~lat_bad_format & ((lats < self._lat_min) | (lats > self._lat_max))),
+            ('CRITICAL_INVALID_LONGITUDE_FORMAT', lon_bad_format),
+            ('CRITICAL_LONGITUDE_OUT_OF_RANGE', ~lon_bad_format & ((lons < self._lon_min) | (lons > self._lon_max)))
+        ]
+        in_range = parsed.copy()
+        for flag, mask in range_masks:
+            mask &= parsed
+            in_range &= ~mask
+            for i in np.flatnonzero(mask).tolist():
+                flags[i].append(flag)
+        
+        # Later steps only see sensors that passed the range checks
+        index = np.flatnonzero(in_range)
+        lat = lats[index]
+        lon = lons[index]
+        lat_list = lat.tolist()
+        lon_list = lon.tolist()
+        index_list = index.tolist()
+        
+        # Step 2: Precision and format checks
+        lat_places = self._decimal_places_array(lat)
+        lon_places = self._decimal_places_array(lon)
+        high_precision = (lat_places > 6) | (lon_places > 6)
+        precision_factor = np.ones(len(index))
+        step_masks = [
+            ('LOW_PRECISION_COORDINATES', (lat_places < 4) | (lon_places < 4), 0.8, precision_factor),
+            ('SUSPICIOUSLY_ROUNDED_COORDINATES', (lat_places <= 3) & (lon_places <= 3), 0.7, precision_factor),
+            ('IDENTICAL_LAT_LON_VALUES', lat == lon, 0.5, precision_factor)
+        ]
+        
+        # Step 3: Suspicious pattern detection
+        pattern_factor = np.ones(len(index))
+        for suspicious_lat, suspicious_lon in self._suspicious_patterns:
+            mask = (np.abs(lat - suspicious_lat) < 0.0001) & (np.abs(lon - suspicious_lon) < 0.0001)
+            step_masks.append((f'SUSPICIOUS_LOCATION_{suspicious_lat}_{suspicious_lon}', mask, 0.2, pattern_factor))
+        
+        # Screen every (sensor, administrative point) pair with a flat-earth squared
+        # distance, then confirm only the near pairs with the exact Haversine distance
+        points_lat = self._administrative_points[:, 0]
+        points_lon = self._administrative_points[:, 1]
+        delta_lat = lat[:, np.newaxis] - points_lat
+        delta_lon = (np.mod(lon[:, np.newaxis] - points_lon + 180, 360) - 180) * np.cos(np.radians(lat))[:, np.newaxis]
+        rows, cols = np.nonzero(delta_lat * delta_lat + delta_lon * delta_lon < self.NEAR_BOUNDARY_SCREEN_SQ_DEG)
+        near = self._calculate_distances(lat[rows], lon[rows], points_lat[cols], points_lon[cols]) < 0.01
+        boundary_hits = np.zeros((len(index), len(points_lat)), dtype=bool)
+        boundary_hits[rows[near], cols[near]] = True
+        for k in range(len(points_lat)):
+            step_masks.append(('NEAR_ADMINISTRATIVE_BOUNDARY', boundary_hits[:, k], 0.8, pattern_factor))
+        
+        for flag, mask, factor, confidence in step_masks:
+            confidence[mask] *= factor
+            for j in np.flatnonzero(mask).tolist():
+                flags[index_list[j]].append(flag)
+        
+        # Step 4: Ocean and land masks
+        ocean_mask = self._is_likely_ocean_batch(lat, lon)
+        land_mask = self._is_on_known_land_batch(lat, lon)
+        
+        confidence_scores = (precision_factor * pattern_factor).tolist()
+        in_range_positions = dict(zip(index_list, range(len(index_list))))
+        ocean_list = ocean_mask.tolist()
+        land_list = land_mask.tolist()
+        high_precision_list = high_precision.tolist()
+        lats_list = lats.tolist()
+        lons_list = lons.tolist()
+        parsed_list = parsed.tolist()
+        
+        # Per-sensor results; only metadata-dependent checks still run per sensor
         for i, sensor in enumerate(sensors):
-            try:
-                lat = float(sensor.get('latitude', 0))
-                lon = float(sensor.get('longitude', 0))
-                metadata = sensor.get('metadata', {})
-                
-                result = self.validate_coordinates(lat, lon, metadata)
-                result['sensor_index'] = i
-                result['sensor_id'] = sensor.get('sensor_id', f'unknown_{i}')
-                
-                validation_summary['validation_results'].append(result)
-                
-                if result['is_valid']:
-                    validation_summary['valid_sensors'] += 1
-                else:
-                    validation_summary['invalid_sensors'] += 1
-                
-                if result['confidence_score'] < 0.7:
-                    validation_summary['suspicious_sensors'] += 1
-                
-                # Aggregate flags for summary
-                for flag in result['validation_flags']:
-                    validation_summary['flag_summary'][flag] = validation_summary['flag_summary'].get(flag, 0) + 1
-                
-            except Exception as e:
-                logger.error(f"Validation failed for sensor {i}: {e}")
+            if not parsed_list[i]:
+                validation_summary['invalid_sensors'] += 1
+                continue
+            
+            metadata = sensor.get('metadata', {})
+            result = {
+                'is_valid': False,
+                'latitude': lats_list[i],
+                'longitude': lons_list[i],
+                'normalized_lat': None,
+                'normalized_lon': None,
+                'validation_flags': flags[i],
+                'confidence_score': 1.0,
+                'metadata': metadata or {}
+            }
+            
+            j = in_range_positions.get(i)
+            if j is not None:
+                result['confidence_score'] = confidence_scores[j]
+                try:
+                    result['confidence_score'] *= self._check_sensor_location(
+                        ocean_list[j], land_list[j], high_precision_list[j], metadata, flags[i]
+                    )
+                    result['normalized_lat'] = self._normalize_latitude(lat_list[j])
+                    result['normalized_lon'] = self._normalize_longitude(lon_list[j])
+                    result['is_valid'] = result['confidence_score'] >= 0.3
+                except Exception as e:
+                    logger.error(f"Coordinate validation failed: {e}")
+                    flags[i].append('CRITICAL_VALIDATION_ERROR')
+            
+            result['sensor_index'] = i
+            result['sensor_id'] = sensor.get('sensor_id', f'unknown_{i}')
+            validation_summary['validation_results'].append(result)
+            
+            if result['is_valid']:
+                validation_summary['valid_sensors'] += 1
+            else:
                 validation_summary['invalid_sensors'] += 1
+            
+            if result['confidence_score'] < 0.7:
+                validation_summary['suspicious_sensors'] += 1
+            
+            # Aggregate flags for summary
+            validation_summary['flag_summary'].update(result['validation_flags'])
         
         # Calculate processing metrics
         processing_time = (datetime.now(timezone.utc) - start_time).total_seconds()
@@ -356,6 +554,62 @@ class CoordinateValidationService:
         
         return validation_summary
     
+    def _extract_coordinate_arrays(self, sensors: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Extract latitude and longitude arrays, marking which sensors parsed"""
+        n = len(sensors)
+        try:
+            lats = np.fromiter((float(sensor.get('latitude', 0)) for sensor in sensors), dtype=np.float64, count=n)
+            lons = np.fromiter((float(sensor.get('longitude', 0)) for sensor in sensors), dtype=np.float64, count=n)
+            return lats, lons, np.ones(n, dtype=bool)
+        except Exception:
+            pass
+        
+        # Convert sensor by sensor so one malformed record doesn't fail the batch
+        lats = np.full(n, np.nan)
+        lons = np.full(n, np.nan)
+        parsed = np.zeros(n, dtype=bool)
+        for i, sensor in enumerate(sensors):
+            try:
+                lats[i] = float(sensor.get('latitude', 0))
+                lons[i] = float(sensor.get('longitude', 0))
+                parsed[i] = True
+            except Exception as e:
+                logger.error(f"Validation failed for sensor {i}: {e}")
+        
+        return lats, lons, parsed
+    
+    def _check_sensor_location(self, is_likely_ocean: bool, is_on_land: bool, has_high_precision: bool,
+                               metadata: Optional[Dict], flags: List[str]) -> float:
+        """Append sensor location flags and return the location confidence factor"""
+        # Read every metadata field up front so malformed metadata fails before any flag is added
+        is_unexpected_ocean = is_likely_ocean and not self._is_marine_sensor(metadata)
+        sensor_type = metadata.get('sensor_type', '').lower() if metadata else ''
+        location_type = metadata.get('location_type', '').lower() if metadata else ''
+        confidence_factor = 1.0
+        
+        # Check if coordinates are in major ocean areas (unlikely for land-based sensors)
+        if is_unexpected_ocean:
+            flags.append('POTENTIAL_OCEAN_LOCATION')
+            confidence_factor *= 0.3
+        
+        # Check if coordinates are on known land areas
+        if not is_on_land:
+            flags.append('UNCERTAIN_LAND_LOCATION')
+            confidence_factor *= 0.6
+        
+        # Indoor sensors with precise coordinates are more suspicious
+        if 'indoor' in location_type and has_high_precision:
+            flags.append('INDOOR_HIGH_PRECISION')
+            confidence_factor *= 0.9
+        
+        # Mobile sensors should have more variable coordinates; without position
+        # history, a high-precision fix is taken to mean the sensor is stationary
+        if 'mobile' in sensor_type and has_high_precision:
+            flags.append('MOBILE_SENSOR_STATIONARY')
+            confidence_factor *= 0.7
+        
+        return confidence_factor
+    
     def filter_valid_sensors(self, sensors: List[Dict], 
                            min_confidence: float = 0.5) -> Tuple[List[Dict], List[Dict]]:
         """Filter sensors into valid and invalid groups"""
@@ -370,16 +624,16 @@ class CoordinateValidationService:
                 
                 validation_result = self.validate_coordinates(lat, lon, metadata)
                 
-                if validation_result['is_valid'] and validation_result['confidence_score'] >= min_confidence:
+                if validation_result.is_valid and validation_result.confidence_score >= min_confidence:
                     # Use normalized coordinates
                     sensor_copy = sensor.copy()
-                    sensor_copy['latitude'] = validation_result['normalized_lat']
-                    sensor_copy['longitude'] = validation_result['normalized_lon']
-                    sensor_copy['coordinate_validation'] = validation_result
+                    sensor_copy['latitude'] = validation_result.normalized_lat
+                    sensor_copy['longitude'] = validation_result.normalized_lon
+                    sensor_copy['coordinate_validation'] = validation_result.to_dict()
                     valid_sensors.append(sensor_copy)
                 else:
                     sensor_copy = sensor.copy()
-                    sensor_copy['coordinate_validation'] = validation_result
+                    sensor_copy['coordinate_validation'] = validation_result.to_dict()
                     invalid_sensors.append(sensor_copy)
                     
             except Exception as e:
@@ -395,17 +649,16 @@ class CoordinateValidationService:
         total_sensors = len(validation_results)
         valid_count = sum(1 for r in validation_results if r['is_valid'])
         
-        # Flag frequency analysis
-        all_flags = []
+        # Flag frequency analysis; confidence scores are products of a few fixed
+        # factors, so counting distinct scores gives an exact median in little memory
+        flag_counts = Counter()
+        score_counts = Counter()
         for result in validation_results:
-            all_flags.extend(result.get('validation_flags', []))
-        
-        flag_counts = {}
-        for flag in all_flags:
-            flag_counts[flag] = flag_counts.get(flag, 0) + 1
+            flag_counts.update(result.get('validation_flags', ()))
+            score_counts[result.get('confidence_score', 0)] += 1
         
-        # Confidence score distribution
-        confidence_scores = [r.get('confidence_score', 0) for r in validation_results]
+        # Confidence score distribution, streamed without materializing the scores
+        n, mean, m2, lo, hi = _running_stats(r.get('confidence_score', 0) for r in validation_results)
         
         report = {
             'summary': {
@@ -415,14 +668,14 @@ class CoordinateValidationService:
                 'validation_rate': valid_count / total_sensors if total_sensors > 0 else 0
             },
             'confidence_distribution': {
-                'mean': np.mean(confidence_scores),
-                'median': np.median(confidence_scores),
-                'min': np.min(confidence_scores),
-                'max': np.max(confidence_scores),
-                'std': np.std(confidence_scores)
+                'mean': mean if n else math.nan,
+                'median': _median_from_counts(score_counts),
+                'min': lo if n else math.nan,
+                'max': hi if n else math.nan,
+                'std': math.sqrt(m2 / n) if n else math.nan
             },
-            'flag_frequency': dict(sorted(flag_counts.items(), key=lambda x: x[1], reverse=True)),
-            'most_common_issues': list(sorted(flag_counts.items(), key=lambda x: x[1], reverse=True)[:5]),
+            'flag_frequency': dict(flag_counts.most_common()),
+            'most_common_issues': flag_counts.most_common(5),
             'generated_at': datetime.now(timezone.utc).isoformat()
         }
         
@@ -101,10 +101,10 @@ class DataHarmonizationService:
                 raw_data.get('metadata', {})
             )
             
-            if coord_validation['is_valid']:
-                harmonized['lat'] = coord_validation['normalized_lat']
-                harmonized['lon'] = coord_validation['normalized_lon']
-                harmonized['coordinate_validation'] = coord_validation
+            if coord_validation.is_valid:
+                harmonized['lat'] = coord_validation.normalized_lat
+                harmonized['lon'] = coord_validation.normalized_lon
+                harmonized['coordinate_validation'] = coord_validation.to_dict()
             else:
                 logger.debug(f"Invalid coordinates skipped: {harmonized.get('lat')}, {harmonized.get('lon')}")
                 return {}  # Skip record with invalid coordinates
@@ -4,9 +4,9 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
-from .async_purpleair_service import AsyncPurpleAirService
+from .async_purpleair_service import purpleair_service
 from .async_nasa_service import AsyncNASAService
-from .async_weather_service import AsyncWeatherService
+from .async_weather_service import weather_service
 from .async_openaq_service import AsyncOpenAQService
 from .redis_cache_service import cache_service
 from .rate_limiter import rate_limit_manager
@@ -20,9 +20,9 @@ class EnhancedAsyncIntegrationService:
         self.db = db_session
         
         # Initialize async services
-        self.purpleair_service = AsyncPurpleAirService()
+        self.purpleair_service = purpleair_service
         self.nasa_service = AsyncNASAService()
-        self.weather_service = AsyncWeatherService()
+        self.weather_service = weather_service
         self.openaq_service = AsyncOpenAQService()
         
         # Integration statistics
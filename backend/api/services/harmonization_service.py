@@ -90,16 +90,16 @@ class DataHarmonizationService:
                     )
                     
                     # Skip sensors with invalid coordinates
-                    if not coord_validation['is_valid']:
+                    if not coord_validation.is_valid:
                         logger.debug(f"Skipping sensor with invalid coordinates: {lat}, {lon}")
                         self.validation_stats['coordinate_errors'] += 1
                         continue
                     
                     # Use normalized coordinates
                     raw_record = raw_record.copy()
-                    raw_record['latitude'] = coord_validation['normalized_lat']
-                    raw_record['longitude'] = coord_validation['normalized_lon']
-                    raw_record['coordinate_validation'] = coord_validation
+                    raw_record['latitude'] = coord_validation.normalized_lat
+                    raw_record['longitude'] = coord_validation.normalized_lon
+                    raw_record['coordinate_validation'] = coord_validation.to_dict()
                 
                 harmonized = self.harmonize_single_record(raw_record, mapping, source)
                 if harmonized:
@@ -4,6 +4,7 @@ import logging
 from typing import Dict, Optional, Tuple
 from dataclasses import dataclass
 from collections import defaultdict, deque
+from functools import wraps
 import random
 
 logger = logging.getLogger(__name__)
@@ -117,6 +118,119 @@ class ExponentialBackoffRateLimiter:
             'requests_in_burst_window': len(self.request_timestamps)
         }
 
+class WeightedTokenBucket:
+    """Token bucket where each request spends a cost matching its upstream price
+    
+    Refills continuously at ``capacity / time_period`` tokens per second.
+    Cheap requests can take tokens left between expensive ones, so quota
+    billed by payload size is used fully without going over.
+    """
+    
+    def __init__(self, capacity: float, time_period: float = 60.0):
+        self.capacity = capacity
+        self.refill_rate = capacity / time_period
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+    
+    async def acquire(self, cost: float = 1.0):
+        """Wait until ``cost`` tokens are available and spend them"""
+        # A single request larger than the bucket must still be able to run
+        cost = min(cost, self.capacity)
+        while True:
+            # No await between the check and the spend, so no lock is needed
+            self._refill()
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return
+            await asyncio.sleep((cost - self._tokens) / self.refill_rate)
+    
+    def get_status(self) -> Dict:
+        """Get current bucket level"""
+        self._refill()
+        return {
+            'capacity': self.capacity,
+            'available_tokens': round(self._tokens, 2),
+            'refill_per_second': self.refill_rate
+        }
+
+class UpstreamBudget:
+    """Tracks the quota an upstream API advertises in its response headers
+    
+    Used as ``async with budget:`` around a request. Entering waits while
+    the advertised remaining budget is already covered by requests in
+    flight and the window has not reset yet. ``update`` records the
+    headers of each response. After a 429, the next request waits exactly
+    the ``Retry-After`` delay instead of backing off exponentially.
+    """
+    
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.in_flight = 0
+    
+    async def __aenter__(self):
+        while True:
+            wait_time = self.reset_at - time.time()
+            if self.remaining is None or self.remaining > self.in_flight or wait_time <= 0:
+                break
+            logger.debug(f"{self.service_name}: Upstream budget exhausted, wait {wait_time:.2f}s")
+            await asyncio.sleep(wait_time)
+        self.in_flight += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        return False
+    
+    def update(self, status_code: int, headers) -> None:
+        """Record the rate-limit headers from an upstream response"""
+        now = time.time()
+        
+        if status_code == 429:
+            retry_after = self._parse_seconds(headers.get("Retry-After"))
+            self.remaining = 0
+            self.reset_at = now + (retry_after if retry_after is not None else 1.0)
+            logger.warning(f"{self.service_name}: Rate limited upstream, "
+                           f"retrying after {self.reset_at - now:.1f}s")
+            return
+        
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        try:
+            self.remaining = int(remaining)
+        except ValueError:
+            return
+        
+        reset = self._parse_seconds(headers.get("X-RateLimit-Reset"))
+        if reset is not None:
+            # Large values are epoch timestamps, small ones are relative delays
+            self.reset_at = reset if reset > 1e9 else now + reset
+    
+    @staticmethod
+    def _parse_seconds(value: Optional[str]) -> Optional[float]:
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+    
+    def get_status(self) -> Dict:
+        """Get the last advertised upstream budget"""
+        return {
+            'service': self.service_name,
+            'remaining': self.remaining,
+            'reset_in_seconds': max(0.0, self.reset_at - time.time()),
+            'in_flight': self.in_flight
+        }
+
 class GlobalRateLimitManager:
     """Global manager for all API rate limiters"""
     
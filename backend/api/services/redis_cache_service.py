@@ -1,12 +1,16 @@
 import redis
 import json
+import msgpack
 import logging
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from datetime import datetime, timedelta
 import pickle
 import os
 from functools import wraps
 import asyncio
+import struct
+import time
+import xxhash
 
 logger = logging.getLogger(__name__)
 
@@ -38,23 +42,40 @@ class RedisCacheService:
             'analysis_results': 7200,     # 2 hours
             'calibration_params': 43200,  # 12 hours
         }
+        
+        # Upstream failures are cached briefly so retries during an outage
+        # short-circuit instead of hammering the failing API
+        self.error_ttl = 10
+        
+        # Keys with a stale-while-revalidate refresh currently running
+        self._swr_refreshing: Dict[str, asyncio.Task] = {}
+    
+    def _deserialize(self, key: str, cached_data: bytes, serializer: str = 'pickle') -> Optional[Any]:
+        """Decode a Redis payload written by ``set`` with the same serializer"""
+        if serializer == 'msgpack':
+            try:
+                return msgpack.unpackb(cached_data, raw=False)
+            except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError):
+                pass  # Written with pickle (e.g. before the switch); fall through
+        
+        try:
+            return pickle.loads(cached_data)
+        except (pickle.PickleError, EOFError):
+            # Try JSON fallback
+            try:
+                return json.loads(cached_data.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.warning(f"Failed to deserialize cached data for key: {key}")
+                return None
     
-    async def get(self, key: str, cache_type: str = 'default') -> Optional[Any]:
+    async def get(self, key: str, cache_type: str = 'default', serializer: str = 'pickle') -> Optional[Any]:
         """Get value from cache with async support"""
         try:
             if self.redis_client:
                 # Use Redis
                 cached_data = self.redis_client.get(key)
                 if cached_data:
-                    try:
-                        return pickle.loads(cached_data)
-                    except (pickle.PickleError, EOFError):
-                        # Try JSON fallback
-                        try:
-                            return json.loads(cached_data.decode('utf-8'))
-                        except (json.JSONDecodeError, UnicodeDecodeError):
-                            logger.warning(f"Failed to deserialize cached data for key: {key}")
-                            return None
+                    return self._deserialize(key, cached_data, serializer)
             else:
                 # Use memory fallback
                 if key in self.memory_cache:
@@ -71,13 +92,49 @@ class RedisCacheService:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
     
+    async def mget(self, keys: List[str], cache_type: str = 'default',
+                   serializer: str = 'pickle') -> Dict[str, Any]:
+        """Get several values in one round trip; missing keys are omitted"""
+        results = {}
+        if not keys:
+            return results
+        
+        try:
+            if self.redis_client:
+                for key, cached_data in zip(keys, self.redis_client.mget(keys)):
+                    if cached_data:
+                        value = self._deserialize(key, cached_data, serializer)
+                        if value is not None:
+                            results[key] = value
+            else:
+                for key in keys:
+                    value = await self.get(key, cache_type)
+                    if value is not None:
+                        results[key] = value
+        except Exception as e:
+            logger.error(f"Cache mget error: {e}")
+        
+        return results
+    
     async def set(self, key: str, value: Any, cache_type: str = 'default', 
-                  custom_ttl: Optional[int] = None) -> bool:
-        """Set value in cache with TTL"""
+                  custom_ttl: Optional[int] = None, serializer: str = 'pickle') -> bool:
+        """Set value in cache with TTL
+        
+        ``serializer='msgpack'`` stores plain dict/list payloads as msgpack,
+        which is faster to encode and decode and smaller on the wire than
+        pickle; values msgpack cannot encode fall back to pickle.
+        """
         try:
             ttl = custom_ttl or self.ttl_config.get(cache_type, 300)
             
             if self.redis_client:
+                if serializer == 'msgpack':
+                    try:
+                        self.redis_client.setex(key, ttl, msgpack.packb(value, use_bin_type=True))
+                        return True
+                    except (TypeError, ValueError, OverflowError):
+                        pass  # Not msgpack-encodable; store with pickle below
+                
                 # Use Redis with pickle for complex objects
                 try:
                     serialized_data = pickle.dumps(value)
@@ -120,11 +177,11 @@ class RedisCacheService:
             return False
     
     async def get_or_set(self, key: str, fetch_function, cache_type: str = 'default', 
-                        custom_ttl: Optional[int] = None) -> Any:
+                        custom_ttl: Optional[int] = None, serializer: str = 'pickle') -> Any:
         """Get from cache or fetch and set if not found"""
         try:
             # Try to get from cache first
-            cached_value = await self.get(key, cache_type)
+            cached_value = await self.get(key, cache_type, serializer)
             if cached_value is not None:
                 logger.debug(f"Cache hit for key: {key}")
                 return cached_value
@@ -133,8 +190,10 @@ class RedisCacheService:
             logger.debug(f"Cache miss for key: {key}, fetching fresh data")
             fresh_data = await fetch_function()
             
-            # Store in cache
-            await self.set(key, fresh_data, cache_type, custom_ttl)
+            # Store in cache; error sentinels only for the short error TTL
+            if self.is_error_sentinel(fresh_data):
+                custom_ttl = self.error_ttl
+            await self.set(key, fresh_data, cache_type, custom_ttl, serializer)
             return fresh_data
             
         except Exception as e:
@@ -146,6 +205,124 @@ class RedisCacheService:
                 logger.error(f"Both cache and fetch failed for key {key}: {fetch_error}")
                 raise
     
+    def error_sentinel(self, status: Optional[int] = None) -> Dict:
+        """Build a cacheable marker for a failed upstream fetch"""
+        return {'__error__': True, 'status': status}
+    
+    @staticmethod
+    def is_error_sentinel(value: Any) -> bool:
+        """Check whether a cached value marks a failed upstream fetch"""
+        return isinstance(value, dict) and value.get('__error__') is True
+    
+    async def get_or_set_swr(self, key: str, fetch_function, cache_type: str = 'default',
+                             ttl: Optional[int] = None, stale_ttl: Optional[int] = None) -> Any:
+        """Get from cache using stale-while-revalidate semantics.
+        
+        Entries younger than ``ttl`` are returned as-is. Entries between ``ttl``
+        and ``stale_ttl`` are returned immediately while a background task
+        refreshes them. Missing or fully expired entries are fetched inline.
+        """
+        ttl = ttl or self.ttl_config.get(cache_type, 300)
+        stale_ttl = max(stale_ttl or ttl, ttl)
+        
+        cached_entry = await self.get(key, cache_type)
+        if isinstance(cached_entry, dict) and 'written_at' in cached_entry:
+            age = time.time() - cached_entry['written_at']
+            if age < ttl:
+                logger.debug(f"Cache hit for key: {key}")
+                return cached_entry['data']
+            if age < stale_ttl:
+                logger.debug(f"Serving stale entry for key: {key} (age {age:.0f}s)")
+                if key not in self._swr_refreshing:
+                    self._swr_refreshing[key] = asyncio.create_task(
+                        self._swr_refresh(key, fetch_function, cache_type, stale_ttl)
+                    )
+                return cached_entry['data']
+        
+        # Cache miss or entry past its stale window - fetch inline
+        logger.debug(f"Cache miss for key: {key}, fetching fresh data")
+        fresh_data = await fetch_function()
+        await self._swr_store(key, fresh_data, cache_type, stale_ttl)
+        return fresh_data
+    
+    async def _swr_refresh(self, key: str, fetch_function, cache_type: str, stale_ttl: int):
+        """Refresh a stale-while-revalidate entry in the background"""
+        try:
+            fresh_data = await fetch_function()
+            await self._swr_store(key, fresh_data, cache_type, stale_ttl)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for key {key}: {e}")
+        finally:
+            self._swr_refreshing.pop(key, None)
+    
+    async def _swr_store(self, key: str, value: Any, cache_type: str, stale_ttl: int) -> bool:
+        """Store a value with its write timestamp, kept for the full stale window"""
+        return await self.set(
+            key,
+            {'data': value, 'written_at': time.time()},
+            cache_type,
+            custom_ttl=stale_ttl
+        )
+    
+    async def geo_index(self, index_key: str, items: List[Tuple[float, float, str, Any]],
+                        cache_type: str = 'default', custom_ttl: Optional[int] = None) -> bool:
+        """Add (longitude, latitude, member, value) items to a Redis GEO index
+        
+        Each value is stored under ``{index_key}:{member}`` so geo searches can
+        return full records. Requires Redis; the memory fallback has no index.
+        """
+        if not self.redis_client:
+            return False
+        
+        try:
+            ttl = custom_ttl or self.ttl_config.get(cache_type, 300)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for longitude, latitude, member, value in items:
+                pipe.geoadd(index_key, [longitude, latitude, member])
+                pipe.setex(f"{index_key}:{member}", ttl, pickle.dumps(value))
+            pipe.expire(index_key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Geo index error for key {index_key}: {e}")
+            return False
+    
+    async def geo_search_box(self, index_key: str, longitude: float, latitude: float,
+                             width_km: float, height_km: float) -> Optional[List[Any]]:
+        """Return indexed values inside a box centred on (longitude, latitude)
+        
+        Results are ordered nearest first. Returns None when the index is
+        unavailable or any indexed value has expired, so callers can fall
+        back to the upstream API.
+        """
+        if not self.redis_client:
+            return None
+        
+        try:
+            members = self.redis_client.geosearch(
+                index_key,
+                longitude=longitude,
+                latitude=latitude,
+                width=width_km,
+                height=height_km,
+                unit='km',
+                sort='ASC'
+            )
+            if not members:
+                return []
+            
+            value_keys = [f"{index_key}:{member.decode('utf-8')}" for member in members]
+            raw_values = self.redis_client.mget(value_keys)
+            if not all(raw_values):
+                # Some values expired before their index entry: the result would be
+                # silently truncated, so report a miss and let callers refetch
+                logger.debug(f"Geo index {index_key} has expired values, treating as a miss")
+                return None
+            return [pickle.loads(raw) for raw in raw_values]
+        except Exception as e:
+            logger.error(f"Geo search error for key {index_key}: {e}")
+            return None
+    
     async def _cleanup_memory_cache(self):
         """Clean up expired entries in memory cache"""
         if not hasattr(self, 'memory_cache'):
@@ -170,6 +347,15 @@ class RedisCacheService:
         param_str = "_".join([f"{k}={v}" for k, v in sorted_params])
         return f"{prefix}:{param_str}"
     
+    def generate_packed_key(self, prefix: str, fmt: str, *parts) -> str:
+        """Generate a compact cache key from primitive parts
+        
+        The parts are packed with ``struct.pack(fmt, ...)`` and hashed with
+        xxh3, skipping the dict/string formatting of ``generate_cache_key``
+        on hot paths. The prefix is kept so pattern clears still match.
+        """
+        return f"{prefix}:{xxhash.xxh3_64_hexdigest(struct.pack(fmt, *parts))}"
+    
     async def clear_pattern(self, pattern: str) -> int:
         """Clear all keys matching pattern"""
         try:
@@ -2,8 +2,10 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timezone, timedelta
 import numpy as np
 import pandas as pd
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from decimal import Decimal
+import copy
 import logging
 
 from ..models.harmonized_models import SensorHarmonized, DataQualityLog
@@ -36,6 +38,25 @@ class SensorQCService:
             'spike_threshold': 3.5,  # Modified Z-score threshold
             'high_humidity_threshold': 85.0  # % RH
         }
+        
+        # Column order of the vectorized QC flag matrix
+        self.qc_flag_names = [
+            'NEGATIVE_PM25',
+            'NEGATIVE_PM10',
+            'EXTREME_PM25',
+            'HIGH_HUMIDITY_UNCERTAINTY',
+            'SUDDEN_SPIKE',
+            'EXTREME_TEMPERATURE',
+            'INVALID_HUMIDITY',
+            'INVALID_PRESSURE',
+            'INVALID_PM_RATIO'
+        ]
+    
+    def with_session(self, db_session: Session) -> 'SensorQCService':
+        """Return a copy bound to another session, sharing the loaded configuration"""
+        bound = copy.copy(self)
+        bound.db = db_session
+        return bound
     
     def apply_qc_rules(self, sensor_data: Dict) -> Dict:
         """Apply comprehensive QC rules to sensor data"""
@@ -119,6 +140,106 @@ class SensorQCService:
         
         return processed_data
     
+    def apply_qc_rules_vectorized(self, df: pd.DataFrame) -> np.ndarray:
+        """Evaluate QC rules over a frame of readings as an (n, n_flags) boolean matrix"""
+        thresholds = self.qc_thresholds
+        
+        def column(name: str) -> np.ndarray:
+            return df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        pm25 = column('raw_pm2_5')
+        pm10 = column('raw_pm10')
+        rh = column('rh')
+        temperature = column('temperature')
+        pressure = column('pressure')
+        
+        # NaN compares False, so missing values never raise a flag
+        with np.errstate(invalid='ignore', divide='ignore'):
+            negative_pm25 = pm25 < 0
+            negative_pm10 = pm10 < 0
+            pm25 = np.where(negative_pm25, np.nan, pm25)
+            pm10 = np.where(negative_pm10, np.nan, pm10)
+            
+            flags = {
+                'NEGATIVE_PM25': negative_pm25,
+                'NEGATIVE_PM10': negative_pm10,
+                'EXTREME_PM25': pm25 > thresholds['pm25_max'],
+                'HIGH_HUMIDITY_UNCERTAINTY': rh > thresholds['high_humidity_threshold'],
+                'SUDDEN_SPIKE': self._detect_sudden_spikes(df['sensor_id'], pm25),
+                'EXTREME_TEMPERATURE': (temperature < thresholds['temperature_min']) | (temperature > thresholds['temperature_max']),
+                'INVALID_HUMIDITY': (rh < thresholds['humidity_min']) | (rh > thresholds['humidity_max']),
+                'INVALID_PRESSURE': (pressure < thresholds['pressure_min']) | (pressure > thresholds['pressure_max']),
+                'INVALID_PM_RATIO': (pm10 > 0) & (pm25 / pm10 > 1.2)
+            }
+        
+        mask = np.column_stack([flags[name] for name in self.qc_flag_names])
+        
+        self._log_qc_results_bulk(df, pm25, mask)
+        
+        return mask
+    
+    def _detect_sudden_spikes(self, sensor_ids: pd.Series, pm25: np.ndarray) -> np.ndarray:
+        """Vectorized modified Z-score spike check against each sensor's recent readings"""
+        spikes = np.zeros(len(pm25), dtype=bool)
+        candidates = sensor_ids.notna().to_numpy() & (np.nan_to_num(pm25) != 0)
+        if not candidates.any():
+            return spikes
+        
+        try:
+            baselines = self._spike_baselines(sensor_ids[candidates].unique().tolist())
+            if baselines.empty:
+                return spikes
+            
+            median = sensor_ids.map(baselines['median']).to_numpy(dtype=np.float64)
+            mad = sensor_ids.map(baselines['mad']).to_numpy(dtype=np.float64)
+            
+            with np.errstate(invalid='ignore', divide='ignore'):
+                modified_z_score = 0.6745 * (pm25 - median) / mad
+                spikes = candidates & (mad > 0) & (np.abs(modified_z_score) > self.qc_thresholds['spike_threshold'])
+            
+            return spikes
+            
+        except Exception as e:
+            logger.error(f"Vectorized spike detection failed: {e}")
+            return spikes
+    
+    def _spike_baselines(self, sensor_ids: List[str], chunk_size: int = 500) -> pd.DataFrame:
+        """Median and MAD of the last 10 readings in 6 hours for each sensor"""
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(hours=6)
+        rows = []
+        
+        for i in range(0, len(sensor_ids), chunk_size):
+            ranked = self.db.query(
+                SensorHarmonized.sensor_id,
+                SensorHarmonized.raw_pm2_5,
+                func.row_number().over(
+                    partition_by=SensorHarmonized.sensor_id,
+                    order_by=SensorHarmonized.timestamp_utc.desc()
+                ).label('recency')
+            ).filter(
+                SensorHarmonized.sensor_id.in_(sensor_ids[i:i + chunk_size]),
+                SensorHarmonized.timestamp_utc >= recent_cutoff,
+                SensorHarmonized.raw_pm2_5.isnot(None)
+            ).subquery()
+            
+            rows.extend(self.db.query(ranked.c.sensor_id, ranked.c.raw_pm2_5).filter(ranked.c.recency <= 10).all())
+        
+        history = pd.DataFrame(rows, columns=['sensor_id', 'raw_pm2_5'])
+        history['raw_pm2_5'] = history['raw_pm2_5'].astype(np.float64)
+        
+        grouped = history.groupby('sensor_id')['raw_pm2_5']
+        median = grouped.transform('median')
+        history['deviation'] = (history['raw_pm2_5'] - median).abs()
+        
+        baselines = history.groupby('sensor_id').agg(
+            count=('raw_pm2_5', 'size'),
+            median=('raw_pm2_5', 'median'),
+            mad=('deviation', 'median')
+        )
+        
+        # Not enough history to judge a spike
+        return baselines[baselines['count'] >= 3]
+    
     def detect_sudden_spike(self, sensor_data: Dict) -> bool:
         """Detect sudden spikes in PM2.5 readings"""
         try:
@@ -189,6 +310,44 @@ class SensorQCService:
             logger.error(f"Failed to log QC results: {e}")
             self.db.rollback()
     
+    def _log_qc_results_bulk(self, df: pd.DataFrame, pm25: np.ndarray, mask: np.ndarray) -> None:
+        """Write one quality log row per raised flag (or pass) for a whole frame"""
+        try:
+            now = datetime.now(timezone.utc)
+            sensor_ids = df['sensor_id'].tolist()
+            timestamps = [ts or now for ts in df['timestamp_utc'].tolist()]
+            original_values = [None if np.isnan(value) else float(value) for value in pm25]
+            
+            row_idx, flag_idx = np.nonzero(mask)
+            log_rows = [
+                {
+                    'sensor_id': sensor_ids[i],
+                    'timestamp_utc': timestamps[i],
+                    'qc_rule': self.qc_flag_names[j],
+                    'rule_result': 'flag',
+                    'original_value': original_values[i],
+                    'flag_reason': f"QC rule triggered: {self.qc_flag_names[j]}"
+                }
+                for i, j in zip(row_idx.tolist(), flag_idx.tolist())
+            ]
+            log_rows.extend(
+                {
+                    'sensor_id': sensor_ids[i],
+                    'timestamp_utc': timestamps[i],
+                    'qc_rule': 'COMPREHENSIVE_QC',
+                    'rule_result': 'pass',
+                    'original_value': original_values[i]
+                }
+                for i in np.flatnonzero(~mask.any(axis=1)).tolist()
+            )
+            
+            self.db.bulk_insert_mappings(DataQualityLog, log_rows)
+            self.db.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to log QC results: {e}")
+            self.db.rollback()
+    
     def get_qc_summary(self, sensor_id: Optional[str] = None, hours_back: int = 24) -> Dict:
         """Get QC summary statistics"""
         try:
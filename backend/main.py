@@ -18,6 +18,8 @@ from api.database import engine, Base
 from api.auth import get_current_user
 from api.models import User
 from api.middleware.nasa_security_middleware import NASASecurityMiddleware
+from api.services.async_purpleair_service import purpleair_service
+from api.services.async_weather_service import weather_service
 
 load_dotenv()
 
@@ -26,6 +28,9 @@ async def lifespan(app: FastAPI):
     # Create database tables
     Base.metadata.create_all(bind=engine)
     yield
+    # Release shared HTTP connection pools
+    await purpleair_service.close()
+    await weather_service.close()
 
 app = FastAPI(
     title="SEIT - Space Environmental Impact Tracker",
@@ -0,0 +1,10 @@
+/*
+# Calibration Staleness Index
+1. Purpose: Let the daily calibration pipeline find stale sensors without a full scan
+2. Schema: sensor_calibration(last_calibrated)
+3. Notes: CONCURRENTLY avoids locking writes; run outside a transaction block
+*/
+
+-- Serves both branches of the stale-sensor lookup (IS NULL and < cutoff)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sensor_calibration_last_calibrated
+    ON sensor_calibration(last_calibrated NULLS FIRST);